@@ -0,0 +1,10 @@
+# coding: utf-8
+"""
+Benchmarks for the hot paths of simplehist, run with airspeed velocity.
+
+Compare the working tree against master, failing on regressions:
+  $ make bench
+
+Or a quick single pass in the current environment:
+  $ make benchquick
+"""
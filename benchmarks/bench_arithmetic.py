@@ -0,0 +1,47 @@
+# coding: utf-8
+"""
+bench_arithmetic.py
+
+Arithmetic on histograms, which propagates flows and sumw2, and merging.
+"""
+
+from simplehist import Hist, sum_hists
+from .common import make_hist
+
+class Arithmetic(object):
+  params = ([1000, 1000000], [False, True])
+  param_names = ["bins", "sumw2"]
+
+  def setup(self, bins, sumw2):
+    self.a = make_hist(bins, sumw2=sumw2)
+    self.b = make_hist(bins, sumw2=sumw2)
+
+  def time_add(self, bins, sumw2):
+    self.a + self.b
+
+  def time_iadd(self, bins, sumw2):
+    self.a += self.b
+
+  def time_scale(self, bins, sumw2):
+    self.a * 2.
+
+  def time_divide(self, bins, sumw2):
+    self.a / (self.b + 1)
+
+  def peakmem_add(self, bins, sumw2):
+    self.a + self.b
+
+class Merge(object):
+  params = ([1000, 1000000], [False, True])
+  param_names = ["bins", "tree"]
+  count = 16
+
+  def setup(self, bins, tree):
+    self.hists = [make_hist(bins, sumw2=True) for _ in range(self.count)]
+    self.target = Hist(self.hists[0].axes, sumw2=True)
+
+  def time_merge(self, bins, tree):
+    self.target.merge(self.hists, tree=tree)
+
+  def time_sum_hists(self, bins, tree):
+    sum_hists(self.hists, tree=tree)
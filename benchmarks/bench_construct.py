@@ -0,0 +1,64 @@
+# coding: utf-8
+"""
+bench_construct.py
+
+Cost of creating histograms, and of deriving new ones from them.
+"""
+
+import numpy
+from simplehist import Hist
+from simplehist.binning import BinningScheme
+from .common import make_edges, make_hist
+
+class Construct(object):
+  params = ([10, 10000, 1000000], [1, 2])
+  param_names = ["bins", "ndim"]
+
+  def setup(self, bins, ndim):
+    self.edges = make_edges(bins, ndim)
+    self.shape = tuple(len(x)-1 for x in self.edges) if ndim > 1 else (len(self.edges)-1,)
+    self.data = numpy.ones(self.shape)
+    self.hist = Hist(self.edges, data=self.data)
+    self.axes = self.hist.axes
+
+  def time_empty(self, bins, ndim):
+    Hist(self.edges)
+
+  def time_with_data(self, bins, ndim):
+    Hist(self.edges, data=self.data)
+
+  def time_shared_axes(self, bins, ndim):
+    Hist(self.axes)
+
+  def time_copy(self, bins, ndim):
+    self.hist.copy()
+
+  def peakmem_empty(self, bins, ndim):
+    Hist(self.edges)
+
+class Binning(object):
+  params = [[10, 10000, 1000000]]
+  param_names = ["bins"]
+
+  def setup(self, bins):
+    self.regular = numpy.linspace(0, 1, bins+1)
+    self.variable = numpy.cumsum(numpy.random.RandomState(3).uniform(0.5, 1, bins+1))
+
+  def time_regular(self, bins):
+    BinningScheme(self.regular)
+
+  def time_variable(self, bins):
+    BinningScheme(self.variable)
+
+class Rebin(object):
+  params = [[10000, 1000000]]
+  param_names = ["bins"]
+
+  def setup(self, bins):
+    self.hist = make_hist(bins, sumw2=True)
+
+  def time_rebin_factor(self, bins):
+    self.hist.rebin(10)
+
+  def time_slice(self, bins):
+    self.hist[10:-10]
@@ -0,0 +1,40 @@
+# coding: utf-8
+"""
+bench_convert.py
+
+Conversion of ROOT histograms, using the stand-ins from the test suite so
+that ROOT isn't needed.
+"""
+
+import numpy
+from simplehist import Hist, ashist
+from simplehist.converter import fromTH1, fromTH2
+from simplehist.test import fakeroot
+
+def _fake(ndim, bins, typename):
+  edges = numpy.linspace(0, 1, bins+1)
+  axes = [fakeroot.TAxis(edges, fixed=True)] * ndim
+  cells = numpy.random.RandomState(5).poisson(5, (bins+2,)*ndim)
+  cls = getattr(fakeroot, "TH{}{}".format(ndim, typename))
+  return cls(axes, cells, sumw2=cells)
+
+class Convert(object):
+  params = ([1, 2], [100, 1000], ["D", "F"])
+  param_names = ["ndim", "bins", "type"]
+
+  def setup(self, ndim, bins, typename):
+    self.source = _fake(ndim, bins, typename)
+    self.direct = fromTH1 if ndim == 1 else fromTH2
+    self.hist = Hist(numpy.linspace(0, 1, bins+1))
+
+  def time_ashist(self, ndim, bins, typename):
+    ashist(self.source)
+
+  def time_direct(self, ndim, bins, typename):
+    self.direct(self.source)
+
+  def peakmem_ashist(self, ndim, bins, typename):
+    ashist(self.source)
+
+  def time_ashist_hist(self, ndim, bins, typename):
+    ashist(self.hist, copy=False)
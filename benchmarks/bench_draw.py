@@ -0,0 +1,81 @@
+# coding: utf-8
+"""
+bench_draw.py
+
+Drawing histograms through matplotlib, without a display.
+"""
+
+from simplehist import draw_hists
+from .common import make_hist
+
+class Draw(object):
+  params = [[100, 10000, 1000000]]
+  param_names = ["bins"]
+  timeout = 120
+
+  def setup(self, bins):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    self.plt = plt
+    self.hist = make_hist(bins)
+    self.figure = plt.figure()
+
+  def teardown(self, bins):
+    self.plt.close("all")
+
+  def time_draw_hist(self, bins):
+    self.hist.draw_hist()
+
+  def time_render(self, bins):
+    "Drawing, including rendering the figure"
+    self.hist.draw_hist()
+    self.figure.canvas.draw()
+
+  def peakmem_render(self, bins):
+    self.hist.draw_hist()
+    self.figure.canvas.draw()
+
+class DrawMany(object):
+  "Overlaying many histograms, one at a time or as a single collection"
+  params = [[10, 300]]
+  param_names = ["count"]
+
+  def setup(self, count):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    self.plt = plt
+    self.hists = [make_hist(1000) for _ in range(count)]
+    self.figure = plt.figure()
+
+  def teardown(self, count):
+    self.plt.close("all")
+
+  def time_draw_hist_each(self, count):
+    for hist in self.hists:
+      hist.draw_hist()
+    self.figure.canvas.draw()
+
+  def time_draw_hists(self, count):
+    draw_hists(self.hists)
+    self.figure.canvas.draw()
+
+class Mesh(object):
+  params = [[100, 1000]]
+  param_names = ["bins"]
+
+  def setup(self, bins):
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    self.plt = plt
+    self.hist = make_hist(bins*bins, ndim=2)
+    self.figure = plt.figure()
+
+  def teardown(self, bins):
+    self.plt.close("all")
+
+  def time_pcolormesh(self, bins):
+    self.hist.pcolormesh()
+    self.figure.canvas.draw()
@@ -0,0 +1,106 @@
+# coding: utf-8
+"""
+bench_fill.py
+
+Throughput of Hist.fill, over binnings, batch sizes, dimensions and dtypes.
+"""
+
+import numpy
+from simplehist import Hist, HistArray
+from .common import make_edges, make_values, rate
+
+class Fill(object):
+  params = ([100, 100000], [10000, 1000000], [1, 2, 3],
+            ["float64", "float32", "int64", "uint32"])
+  param_names = ["bins", "entries", "ndim", "dtype"]
+
+  def setup(self, bins, entries, ndim, dtype):
+    self.hist = Hist(make_edges(bins, ndim), dtype=dtype)
+    self.values = make_values(entries, ndim)
+
+  def time_fill(self, bins, entries, ndim, dtype):
+    self.hist.fill(self.values)
+
+  def peakmem_fill(self, bins, entries, ndim, dtype):
+    self.hist.fill(self.values)
+
+  def track_entries_per_second(self, bins, entries, ndim, dtype):
+    return rate(lambda: self.hist.fill(self.values), entries)
+  track_entries_per_second.unit = "entries/s"
+
+class FillVariable(object):
+  "Filling axes with uneven bins, which can't use the arithmetic lookup"
+  params = ([100, 100000], [1000000])
+  param_names = ["bins", "entries"]
+
+  def setup(self, bins, entries):
+    self.hist = Hist(make_edges(bins, regular=False))
+    self.values = make_values(entries)
+
+  def time_fill(self, bins, entries):
+    self.hist.fill(self.values)
+
+  def track_entries_per_second(self, bins, entries):
+    return rate(lambda: self.hist.fill(self.values), entries)
+  track_entries_per_second.unit = "entries/s"
+
+class FillWeighted(object):
+  "Filling with per-entry weights, with and without sumw2"
+  params = ([100, 100000], [False, True])
+  param_names = ["bins", "sumw2"]
+  entries = 1000000
+
+  def setup(self, bins, sumw2):
+    self.hist = Hist(make_edges(bins), sumw2=sumw2)
+    self.values = make_values(self.entries)
+    self.weights = numpy.random.RandomState(7).uniform(0, 2, self.entries)
+
+  def time_fill(self, bins, sumw2):
+    self.hist.fill(self.values, weights=self.weights)
+
+  def track_entries_per_second(self, bins, sumw2):
+    return rate(lambda: self.hist.fill(self.values, weights=self.weights), self.entries)
+  track_entries_per_second.unit = "entries/s"
+
+class FillIter(object):
+  "Streaming a large source through fill_iter in chunks"
+  params = [[10000, 1000000]]
+  param_names = ["chunksize"]
+  entries = 4000000
+
+  def setup(self, chunksize):
+    self.hist = Hist(make_edges(1000))
+    self.values = make_values(self.entries)
+
+  def time_fill_iter(self, chunksize):
+    self.hist.fill_iter(self.values, chunksize=chunksize)
+
+  def peakmem_fill_iter(self, chunksize):
+    self.hist.fill_iter(self.values, chunksize=chunksize)
+
+class FillIndex(object):
+  "Filling the same values repeatedly, with their bins found once"
+  params = ([100, 100000], [1, 3])
+  param_names = ["bins", "ndim"]
+  entries = 1000000
+  variations = 20
+
+  def setup(self, bins, ndim):
+    self.hist = Hist(make_edges(bins, ndim))
+    self.values = make_values(self.entries, ndim)
+    self.index = self.hist.bin_index(self.values)
+    self.weights = numpy.random.RandomState(9).uniform(0, 2, (self.variations, self.entries))
+    self.array = HistArray(self.variations, self.hist.axes)
+
+  def time_bin_index(self, bins, ndim):
+    self.hist.bin_index(self.values)
+
+  def time_fill_index(self, bins, ndim):
+    self.hist.fill(self.index, self.weights[0])
+
+  def time_fill_weights(self, bins, ndim):
+    self.array.fill_weights(self.index, self.weights)
+
+  def track_entries_per_second(self, bins, ndim):
+    return rate(lambda: self.hist.fill(self.index, self.weights[0]), self.entries)
+  track_entries_per_second.unit = "entries/s"
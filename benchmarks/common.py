@@ -0,0 +1,36 @@
+# coding: utf-8
+"""
+common.py
+
+Shared setup for the benchmarks.
+"""
+
+import timeit
+import numpy
+from simplehist import Hist
+
+def make_edges(bins, ndim=1, regular=True):
+  """Edges for a histogram with roughly the given total number of bins,
+  split evenly between the axes"""
+  per_axis = max(int(round(bins ** (1./ndim))), 1)
+  if regular:
+    edges = numpy.linspace(0, 1, per_axis+1)
+  else:
+    edges = numpy.sort(numpy.random.RandomState(1).uniform(0, 1, per_axis+1))
+    edges[0], edges[-1] = 0, 1
+  return edges if ndim == 1 else (edges,) * ndim
+
+def make_values(entries, ndim=1):
+  "Random coordinates spread over the bins, with a little in the flows"
+  values = numpy.random.RandomState(42).uniform(-0.05, 1.05, (ndim, entries))
+  return values[0] if ndim == 1 else tuple(values)
+
+def make_hist(bins, ndim=1, dtype=float, sumw2=False):
+  "A histogram filled with some entries"
+  hist = Hist(make_edges(bins, ndim), dtype=dtype, sumw2=sumw2)
+  hist.fill(make_values(min(10*bins, 100000), ndim))
+  return hist
+
+def rate(function, entries, repeat=5):
+  "The best rate of processing entries per second over some calls"
+  return entries / min(timeit.repeat(function, number=1, repeat=repeat))
@@ -2,4 +2,9 @@
 #__all__ = ["hists", "binning"]
 
 from .hists import *
-from .converter import ashist
\ No newline at end of file
+from .converter import ashist, ashist_many
+from .storage import save_hists, HistFile, create_hists
+from .sparse import SparseHist
+from .book import HistBook
+from .histarray import HistArray
+from . import instrument
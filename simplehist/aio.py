@@ -0,0 +1,142 @@
+# coding: utf-8
+
+"""
+aio.py
+
+Filling histograms from asynchronous sources of records, such as sockets
+or queues, without binning one record at a time on the event loop.
+
+Records are gathered into batches, by count or by time, and each batch is
+binned in a worker thread. This module needs Python 3, so it isn't
+imported with the rest of the package:
+  >>> from simplehist.aio import HistStream
+  >>> stream = HistStream(Hist(numpy.linspace(0, 100, 101)))
+  >>> await stream.consume(records())
+
+While it runs, a consistent copy can be taken for publishing:
+  >>> publish(stream.snapshot())
+
+Each record is a single value for a 1D histogram, or a sequence of
+coordinates otherwise. With weighted=True records are (value, weight)
+pairs instead.
+"""
+
+import asyncio
+import threading
+import concurrent.futures
+import numpy
+
+class HistStream(object):
+  """Fills a histogram from an asynchronous iterable of records, in batches.
+
+  A batch is filled once it holds batch_size records, or once interval
+  seconds have passed since its first record arrived. At most pending
+  batches wait to be filled at once; beyond that records are buffered up to a
+  batch's worth, and then the source is no longer read until the fills
+  catch up. Batches are filled in a private worker thread, or using
+  executor if given. They are always filled one at a time, but only the
+  private thread fills them in the order they arrived; an executor with
+  several threads may not, which can change float sums by rounding."""
+  def __init__(self, hist, batch_size=4096, interval=0.05, pending=2,
+               executor=None, weighted=False):
+    self.hist = hist
+    self.batch_size = batch_size
+    self.interval = interval
+    self.pending = pending
+    self.weighted = weighted
+    self._executor = executor
+    self._lock = threading.Lock()
+    # Records and batches filled so far
+    self.records = 0
+    self.batches = 0
+
+  def snapshot(self):
+    """A copy of the histogram as it was between two batches. Blocks
+    while a batch is being filled, but doesn't stop records being read."""
+    with self._lock:
+      return self.hist.copy()
+
+  async def snapshot_async(self):
+    "Take a snapshot in a worker thread, without blocking the event loop"
+    return await asyncio.get_running_loop().run_in_executor(None, self.snapshot)
+
+  async def consume(self, source):
+    """Fill from every record of an asynchronous iterable, returning the
+    number of records once it is exhausted and every batch is filled"""
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=self.batch_size)
+    finished = object()
+
+    async def produce():
+      try:
+        async for record in source:
+          await queue.put(record)
+      finally:
+        await queue.put(finished)
+
+    producer = asyncio.ensure_future(produce())
+    executor = self._executor or concurrent.futures.ThreadPoolExecutor(1)
+    slots = asyncio.Semaphore(self.pending)
+    fills = []
+    count = 0
+    try:
+      exhausted = False
+      while not exhausted:
+        record = await queue.get()
+        if record is finished:
+          break
+        batch = [record]
+        deadline = loop.time() + self.interval
+        while len(batch) < self.batch_size:
+          try:
+            record = queue.get_nowait()
+          except asyncio.QueueEmpty:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+              break
+            try:
+              record = await asyncio.wait_for(queue.get(), remaining)
+            except asyncio.TimeoutError:
+              break
+          if record is finished:
+            exhausted = True
+            break
+          batch.append(record)
+        count += len(batch)
+
+        # Waiting for a free slot is what holds back the source
+        await slots.acquire()
+        for done in [x for x in fills if x.done()]:
+          fills.remove(done)
+          done.result()
+        future = loop.run_in_executor(executor, self._fill, batch)
+        future.add_done_callback(lambda _: slots.release())
+        fills.append(future)
+
+      await producer
+      for future in fills:
+        await future
+    finally:
+      if not producer.done():
+        producer.cancel()
+        try:
+          await producer
+        except (asyncio.CancelledError, Exception):
+          pass
+      if self._executor is None:
+        executor.shutdown(wait=False)
+    return count
+
+  def _fill(self, batch):
+    "Convert a batch of records into arrays and fill them, in a worker"
+    weights = None
+    if self.weighted:
+      batch, weights = zip(*batch)
+      weights = numpy.asarray(weights)
+    values = numpy.asarray(batch)
+    if self.hist.ndim > 1:
+      values = values.T
+    with self._lock:
+      self.hist.fill(values, weights)
+      self.records += len(batch)
+      self.batches += 1
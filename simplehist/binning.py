@@ -12,11 +12,36 @@ __license__ = """Copyright (c) 2011 Nicholas Devenish <n.e.devenish@sussex.ac.uk
 MIT License <http://www.opensource.org/licenses/mit-license.php>
 """
 
+import hashlib
 import numpy
 
-class BinError(Exception):
+class BinError(ValueError):
   pass
 
+# Maximum deviation of any edge from exact even spacing, as a fraction of
+# the bin width, for an axis to be treated as regular. Anything under half
+# a bin is safe, as arithmetic lookups are corrected against the edges.
+REGULAR_TOLERANCE = 1e-6
+
+# How close, as a fraction of the average bin width, a requested edge must
+# be to an existing edge to be considered the same
+EDGE_TOLERANCE = 1e-6
+
+def _regular_spacing(edges):
+  """Returns the (offset, scale) to map values onto bin numbers, if the
+  edges are evenly spaced, otherwise None"""
+  if len(edges) < 2:
+    return None
+  low, high = float(edges[0]), float(edges[-1])
+  if not (numpy.isfinite(low) and numpy.isfinite(high) and high > low):
+    return None
+  bincount = len(edges)-1
+  width = (high-low)/bincount
+  expected = numpy.linspace(low, high, len(edges))
+  if numpy.all(numpy.abs(edges - expected) <= REGULAR_TOLERANCE * width):
+    return (low, 1./width)
+  return None
+
 # class Bin(object):
 #   """Represents a single bin"""
 #   def __init__(self, lowedge, highedge):
@@ -29,78 +54,182 @@ class BinningScheme(object):
   """Holds all the information on a particular scheme of binning, for one axis"""
   def __init__(self, binarray):
     """Create a binning scheme from a source set of bins"""
-    
-    if len(binarray) == 1:
+    edges = numpy.asarray(binarray)
+    if not edges.ndim == 1:
+      raise BinError("Bins for a single axis must be one-dimensional")
+    if len(edges) == 1:
       raise BinError("Must provide more that one value for a single bin")
-      
-    # Calculate the number of bins
-    if len(binarray) == 0:
-      bincount = 0
-    else:
-      bincount = len(binarray)-1
-    
+
     # Ensure the bins are numerically sequential
-    if not tuple(binarray) == tuple(sorted(binarray)):
+    if not numpy.all(edges[1:] >= edges[:-1]):
       raise BinError("Bins must be numerically ascending")
-    
-    self._bintuple = tuple(binarray)
+
+    # Keep a private, read-only copy unless we were handed one already
+    if edges.flags.writeable:
+      edges = edges.copy()
+      edges.setflags(write=False)
+    self._edges = edges
+    self._centers = None
+    self._widths = None
+    self._fingerprint = None
+    self._detect_spacing()
+
+  def _detect_spacing(self):
+    "Look for even spacing of the edges, either linear or logarithmic"
+    self._spacing = _regular_spacing(self._edges)
+    self._log = False
+    if self._spacing is None and len(self._edges) and self._edges[0] > 0:
+      self._spacing = _regular_spacing(numpy.log(self._edges))
+      self._log = self._spacing is not None
+
+  def subset(self, positions):
+    """Returns a new binning scheme using only the edges at the given
+    ascending positions, without validating them again. A slice of
+    positions shares the edges of this scheme rather than copying them."""
+    scheme = BinningScheme.__new__(BinningScheme)
+    scheme._edges = _readonly(self._edges[positions])
+    scheme._centers = None
+    scheme._widths = None
+    scheme._fingerprint = None
+    if isinstance(positions, slice):
+      steps = numpy.repeat(positions.step or 1, len(scheme._edges)-1)
+    else:
+      steps = numpy.diff(positions)
+    if self._spacing is not None and len(steps) and steps.min() == steps.max():
+      # Every nth edge of an evenly spaced axis is still evenly spaced
+      low = float(scheme._edges[0])
+      scheme._spacing = (numpy.log(low) if self._log else low, self._spacing[1] / steps[0])
+      scheme._log = self._log
+    else:
+      scheme._detect_spacing()
+    return scheme
   
   def __len__(self):
-    if len(self._bintuple) is 0:
-      return 0
-    return len(self._bintuple)-1
-  
+    return max(len(self._edges)-1, 0)
+
   def __getitem__(self, key):
-    return self._bintuple[key]
-  
+    return self._edges[key]
+
+  def __array__(self, dtype=None, copy=None):
+    return numpy.asarray(self._edges, dtype=dtype)
+
+  @property
+  def fingerprint(self):
+    """A digest of the bin edges, calculated once, for quickly checking
+    whether two axes are binned identically"""
+    if self._fingerprint is None:
+      edges = numpy.ascontiguousarray(self._edges, dtype=float)
+      self._fingerprint = hashlib.sha1(edges.tobytes()).hexdigest()
+    return self._fingerprint
+
+  @property
+  def regular(self):
+    """Are the bins evenly spaced"""
+    return self._spacing is not None and not self._log
+
+  @property
+  def logregular(self):
+    """Are the bins evenly spaced in log(x)"""
+    return self._log
+
+  def index(self, values):
+    """Returns the bin index for every value in an array.
+
+    Values below the axis are given index -1, and values at or above
+    the top edge (or NaN) are given the bin count, as with
+    numpy.digitize(values, edges) - 1."""
+    values = numpy.asarray(values)
+    if self._spacing is None:
+      index = numpy.searchsorted(self._edges, values, side="right")
+      index -= 1
+      return index
+    # Evenly spaced: Calculate the bin number directly
+    edges = self._edges
+    bincount = len(edges)-1
+    offset, scale = self._spacing
+    with numpy.errstate(invalid="ignore", divide="ignore"):
+      if self._log:
+        position = numpy.log(values)
+      else:
+        position = numpy.array(values, dtype=float)
+      position -= offset
+      position *= scale
+      numpy.floor(position, out=position)
+    # Clamp into the valid range (fmax/fmin also map NaN into range)
+    numpy.fmax(position, 0, out=position)
+    numpy.fmin(position, bincount-1, out=position)
+    index = position.astype(numpy.intp)
+    # Correct any rounding errors against the real edges
+    index -= values < edges[index]
+    index += values >= edges[index+1]
+    # And mark the flows
+    index[values < edges[0]] = -1
+    index[~(values < edges[-1])] = bincount
+    return index
+
+  def rebin_indices(self, bins):
+    """Returns the indices of the edges kept in a coarser binning.
+
+    bins is either an integer number of adjacent bins to combine, which
+    must divide the bin count, or a new set of edges which must all be
+    existing edges."""
+    bincount = len(self)
+    if numpy.ndim(bins) == 0:
+      factor = int(bins)
+      if factor < 1 or bincount % factor:
+        raise BinError("Cannot combine {} bins in groups of {}".format(bincount, bins))
+      return numpy.arange(0, bincount+1, factor)
+
+    edges = self._edges
+    requested = numpy.asarray(bins, dtype=float)
+    if len(requested) < 2:
+      raise BinError("Must provide more that one value for a single bin")
+    # Find the closest existing edge to each requested one
+    upper = numpy.clip(numpy.searchsorted(edges, requested), 0, bincount)
+    lower = numpy.clip(upper-1, 0, bincount)
+    closer = numpy.abs(edges[lower]-requested) < numpy.abs(edges[upper]-requested)
+    nearest = numpy.where(closer, lower, upper)
+    tolerance = EDGE_TOLERANCE * float(edges[-1]-edges[0]) / bincount
+    if numpy.any(numpy.abs(edges[nearest]-requested) > tolerance):
+      raise BinError("New bin edges must all be existing bin edges")
+    if numpy.any(numpy.diff(nearest) <= 0):
+      raise BinError("Bins must be numerically ascending")
+    return nearest
+
   @property
   def centers(self):
     """Returns the bin centers for every bin"""
-    vals = []
-    for i, low in enumerate(self._bintuple[:-1]):
-      high = self._bintuple[i+1]
-      vals.append(low + (high-low)/2.)
-    return tuple(vals)
-  
+    if self._centers is None:
+      self._centers = _readonly(self._edges[:-1] + self.widths/2.)
+    return self._centers
+
+  @property
+  def widths(self):
+    """Returns the width of every bin"""
+    if self._widths is None:
+      self._widths = _readonly(numpy.diff(self._edges))
+    return self._widths
+
   @property
   def lowedges(self):
     """Returns the bin lower edges"""
-    return self._bintuple[:-1]
-  
+    return self._edges[:-1]
+
   @property
   def edges(self):
-    """Returns the bin lower edges"""
-    return self._bintuple
-
-
-def search_bins(value, bins, depth = 0):
-  "Search an array of sequential bin edges for the correct bin"
-  # depth += 1
-  # spacing = "  " * depth
-  # 
-  # print spacing + "Searching:", bins
-  # 
-  if len(bins) == 2:
-    # print spacing + "Found single bin"
-    return 0
-
-  # Grab the center bin
-  central = (len(bins)-1) // 2
-  # print spacing + "Central =", central, "(" + str(bins[central]) + ")"
-
-  # Is this higher than our value
-  if bins[central] > value:
-    # Search below
-    # print spacing + "Searching below"
-    found =  search_bins(value, bins[:central+1], depth)
-    return found
-
-  # Is the center bin lower than our value?
-  if bins[central] <= value:
-    # Search above
-    # print spacing + "Searching Above"
-    found =  search_bins(value, bins[central:], depth)
-#    print spacing + "Search at level %d of" % depth, bins[central:], "returned", found
-    return central + found
-
-  raise RuntimeError("Didn't match any bin!")
+    """Returns all of the bin edges"""
+    return self._edges
+
+
+def _readonly(array):
+  array.setflags(write=False)
+  return array
+
+def search_bins(value, bins):
+  """Search an array of sequential bin edges for the correct bin.
+
+  value may be a single value or an array of values. Values outside of
+  the bins are placed in the first or last bin."""
+  bins = numpy.asarray(bins)
+  found = numpy.searchsorted(bins, value, side="right") - 1
+  return numpy.clip(found, 0, len(bins)-2)
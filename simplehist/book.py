@@ -0,0 +1,128 @@
+# coding: utf-8
+
+"""
+book.py
+
+Booking many histograms against the named columns of record batches, so
+that each batch can fill all of them in one pass.
+
+Book histograms against columns, optionally with weight and selection
+columns:
+  >>> book = HistBook()
+  >>> book.book("pt", Hist(numpy.linspace(0, 100, 51)), "pt")
+  >>> book.book("pt_weighted", Hist(numpy.linspace(0, 100, 51)), "pt",
+  ...           weight="w", selection="central")
+  >>> book.book("pt_eta", Hist((numpy.linspace(0, 100, 51), [-2, 0, 2])),
+  ...           ("pt", "eta"))
+
+Then fill from a dictionary of arrays, or a structured array:
+  >>> book.fill({"pt": pt, "eta": eta, "w": w, "central": abs(eta) < 1})
+  >>> book["pt_eta"]
+  Hist(...)
+
+Bin indices are calculated once per batch for every distinct pairing of
+column and binning, and shared between every histogram using them.
+
+Histograms booked with narrow integer storage, such as uint32 counts, are
+replaced with 64-bit copies when a fill could overflow them, so always
+fetch them from the book rather than keeping the booked object.
+"""
+
+import numpy
+from .hists import _as_weights
+from . import instrument
+
+class _Booking(object):
+  "A histogram booked against named columns"
+  def __init__(self, hist, columns, weight, selection):
+    self.hist = hist
+    self.columns = columns
+    self.weight = weight
+    self.selection = selection
+    # Axes binned identically share an index, whichever hist they belong to
+    self.keys = [(column, axis.fingerprint) for column, axis in zip(columns, hist.axes)]
+
+class HistBook(object):
+  """A collection of named histograms, each booked against columns of
+  the batches it is filled from"""
+  def __init__(self):
+    self._bookings = {}
+    self._names = []
+
+  def book(self, name, hist, columns, weight=None, selection=None):
+    """Book a histogram to be filled from the named columns.
+
+    columns is a column name, or a sequence with one name for each axis of
+    the histogram. weight and selection may be the name of a column, or a
+    function called with the batch that returns the array; selection
+    should give a boolean mask of the entries to fill."""
+    if isinstance(columns, str):
+      columns = (columns,)
+    columns = tuple(columns)
+    if not len(columns) == hist.ndim:
+      raise ValueError("Need a column for each of {} axes".format(hist.ndim))
+    if not name in self._bookings:
+      self._names.append(name)
+    self._bookings[name] = _Booking(hist, columns, weight, selection)
+
+  def fill(self, batch):
+    """Fill every booked histogram from a batch of records; a dictionary
+    of arrays, a structured array or anything else indexed by column"""
+    indices = {}
+    derived = {}
+    for name in self._names:
+      started = instrument.clock() if instrument.enabled else None
+      booking = self._bookings[name]
+      hist = booking.hist
+      for key, axis in zip(booking.keys, hist.axes):
+        if not key in indices:
+          indices[key] = axis.index(numpy.asarray(batch[key[0]]).ravel())
+      axis_indices = [indices[key] for key in booking.keys]
+
+      weights = None
+      if booking.weight is not None:
+        weights = _column(batch, booking.weight, derived)
+      weights = _as_weights(weights, axis_indices[0].shape)
+      if booking.selection is not None:
+        mask = _column(batch, booking.selection, derived).astype(bool)
+        axis_indices = [x[mask] for x in axis_indices]
+        if weights is not None and weights.ndim > 0:
+          weights = weights[mask]
+      try:
+        inside = hist._accumulate(axis_indices, weights)
+      except OverflowError:
+        # Narrow storage that is filling up is widened, replacing the booking
+        booking.hist = hist = hist.promoted()
+        inside = hist._accumulate(axis_indices, weights)
+      if started is not None:
+        entries = len(axis_indices[0])
+        instrument.record(hist, "fill", entries, entries - inside, started)
+
+  def __getitem__(self, name):
+    return self._bookings[name].hist
+
+  def __contains__(self, name):
+    return name in self._bookings
+
+  def __iter__(self):
+    return iter(self._names)
+
+  def __len__(self):
+    return len(self._names)
+
+  def keys(self):
+    return list(self._names)
+
+  def items(self):
+    return [(name, self[name]) for name in self._names]
+
+def _column(batch, source, cache):
+  """Fetch a weight or selection column from a batch, or calculate it,
+  only once per batch"""
+  key = source if isinstance(source, str) else id(source)
+  if not key in cache:
+    if callable(source):
+      cache[key] = numpy.asarray(source(batch)).ravel()
+    else:
+      cache[key] = numpy.asarray(batch[source]).ravel()
+  return cache[key]
@@ -4,78 +4,141 @@
 into this system so that additional type converters can be added."""
 
 import itertools
+import numpy
 from .hists import Hist
+from . import instrument
 
 _type_registry = {}
+# Converter for each concrete type seen by ashist, or None if there isn't one
+_dispatch_cache = {}
+_registration_order = itertools.count()
 
 def ashist(hist, copy=True):
   """Converts from an input object to a Hist histogram"""
   if isinstance(hist, Hist) and not copy:
     return hist
   if isinstance(hist, Hist):
-    return Hist(hist.bins, data=hist)
-  else:
-    # Look up in the type converter
-    names = [x.__module__ + "." + x.__name__ for x in itertools.chain(type(hist).__bases__, [type(hist)])]
-    converters = []
-    for key, converter in _type_registry.items():
-      if callable(key):
-        if not key(hist):
-          continue
-      else:
-        if not key in names:
-          continue
-      converters.append(converter)
-
-    #converters = [x for x in _type_registry.keys() if x in names]
-    if not converters:
-      raise RuntimeError("Do not know how to convert object {}".format(type(hist)))
-    return converters[-1](hist)
-
-
-def converts_type(typename):
+    return hist.copy()
+  try:
+    converter = _dispatch_cache[type(hist)]
+  except KeyError:
+    converter = _dispatch_cache[type(hist)] = _find_converter(hist)
+  if converter is None:
+    raise RuntimeError("Do not know how to convert object {}".format(type(hist)))
+  if not instrument.enabled:
+    return converter(hist)
+  started = instrument.clock()
+  converted = converter(hist)
+  instrument.record(converted, "ashist", converted.size, 0, started,
+                    source=type(hist).__name__)
+  return converted
+
+def ashist_many(hists, copy=True):
+  """Converts every object in an iterable to a Hist, returning a list"""
+  return [ashist(x, copy=copy) for x in hists]
+
+def _find_converter(hist):
+  """Find the best registered converter for the type of an object.
+
+  Candidates are ranked by priority, then by how specific a match they are
+  (predicates test the object itself, names match anywhere in the MRO),
+  then by the most recently registered."""
+  names = [x.__module__ + "." + x.__name__ for x in type(hist).__mro__]
+  best, bestrank = None, None
+  for key, (converter, priority, order) in _type_registry.items():
+    if callable(key):
+      if not key(hist):
+        continue
+      depth = 0
+    elif key in names:
+      depth = names.index(key)
+    else:
+      continue
+    rank = (priority, -depth, order)
+    if bestrank is None or rank > bestrank:
+      best, bestrank = converter, rank
+  return best
+
+def converts_type(typename, priority=0):
+  """Register a function to convert a type to Hist.
+
+  typename is either the qualified name of a class (matching subclasses
+  too), or a predicate called with the object to convert. The best
+  converter is found once per concrete type and cached, so predicates
+  must depend only on the type of their argument. Where several
+  converters match, the highest priority wins."""
   def _wrap(fn):
-    _type_registry[typename] = fn
-    def _decorate(*args, **kwargs):
-      fn(*args, **kwargs)
-    return _decorate
+    _type_registry[typename] = (fn, priority, next(_registration_order))
+    _dispatch_cache.clear()
+    return fn
   return _wrap
 
+# Storage type of ROOT histograms, from the last letter of the class name
+_ROOT_DTYPES = {"C": numpy.int8, "S": numpy.int16, "I": numpy.int32,
+                "L": numpy.int64, "F": numpy.float32, "D": numpy.float64}
+
+def _root_buffer(pointer, dtype, count):
+  "View a ROOT array pointer as a numpy array, without copying"
+  if hasattr(pointer, "SetSize"):
+    # Older PyROOT buffers need to be told their length
+    pointer.SetSize(count)
+  elif hasattr(pointer, "reshape"):
+    # As do cppyy low-level views
+    pointer.reshape((count,))
+  return numpy.frombuffer(pointer, dtype=dtype, count=count)
+
+def _axis_edges(axis):
+  "Read all the bin edges of a ROOT TAxis at once"
+  bincount = axis.GetNbins()
+  variable = axis.GetXbins()
+  if variable.GetSize():
+    return _root_buffer(variable.GetArray(), numpy.float64, bincount+1).copy()
+  return numpy.linspace(axis.GetXmin(), axis.GetXmax(), bincount+1)
+
+def _cells(pointer, dtype, shape):
+  """View a ROOT cell array, which includes flow bins and has the x axis
+  varying fastest, with the axes in histogram order"""
+  count = int(numpy.prod(shape))
+  return _root_buffer(pointer, dtype, count).reshape(shape[::-1]).T
+
+def _fromROOT(hist, ndim):
+  """Convert a ROOT histogram of any dimension, reading the contents from
+  its contiguous cell buffers and stripping the flow bins in numpy"""
+  dtype = _ROOT_DTYPES.get(hist.ClassName()[-1])
+  if dtype is None:
+    raise RuntimeError("Do not know the storage type of {}".format(hist.ClassName()))
+  axes = [hist.GetXaxis(), hist.GetYaxis(), hist.GetZaxis()][:ndim]
+  edges = [_axis_edges(x) for x in axes]
+  shape = tuple(len(x)+1 for x in edges)
+  cells = _cells(hist.GetArray(), dtype, shape)
+  inner = tuple(slice(1, -1) for _ in shape)
+
+  newh = Hist(edges[0] if ndim == 1 else tuple(edges),
+              data=numpy.ascontiguousarray(cells[inner]))
+  # An entry is in the flow of every axis it lies outside of
+  for axis in range(ndim):
+    newh._underflow[axis] = cells.take(0, axis=axis).sum()
+    newh._overflow[axis] = cells.take(-1, axis=axis).sum()
+  if hist.GetSumw2N():
+    # Weighted fills leave fractional sums of squares even in integer
+    # histograms, so these are kept as floating point
+    sumw2 = _cells(hist.GetSumw2().GetArray(), numpy.float64, shape)[inner]
+    newh._sumw2 = numpy.array(sumw2, dtype=numpy.promote_types(dtype, numpy.float32))
+  return newh
+
 # @converts_type('ROOT.TH1')
 # @converts_type('__main__.TH1')
 @converts_type(lambda x: hasattr(x, "ClassName") and x.ClassName().startswith("TH1"))
 def fromTH1(hist):
   """Creates a hist object from a pyROOT TH1 object"""
-  binedges = []
-  bincontents = []
-  bincount = hist.GetNbinsX()
-  # Grab the bin values
-  for bin in range(1,bincount+2):
-    binedges.append(hist.GetBinLowEdge(bin))
-
-  # Grab the data values separately
-  for bin in range(1,bincount+1):
-    bincontents.append(hist.GetBinContent(bin))
-  
-  # Grab the overflow and underflow
-  overflow = hist.GetBinContent(bincount+1)
-  underflow = hist.GetBinContent(0)
-
-  # Build the new histogram
-  newh = Hist(binedges, data=bincontents)
-  newh.overflow = overflow
-  newh.underflow = underflow
-  return newh
+  return _fromROOT(hist, 1)
 
 @converts_type(lambda x: hasattr(x, "ClassName") and x.ClassName().startswith("TH2"))
 def fromTH2(hist):
   """Convert a TH2 histogram"""
-  bincount = (hist.GetNbinsX(), hist.GetNbinsY())
-  binedges = ([hist.GetXaxis().GetBinLowEdge(x) for x in range(1,bincount[0]+2)],
-              [hist.GetYaxis().GetBinLowEdge(x) for x in range(1,bincount[1]+2)])
-
-  h = Hist(binedges)
-  for xbin in range(1,bincount[0]+1):
-    for ybin in range(1,bincount[1]+1):
-      h[xbin-1,ybin-1] = hist.GetBinContent(xbin,ybin)
-  return h
\ No newline at end of file
+  return _fromROOT(hist, 2)
+
+@converts_type(lambda x: hasattr(x, "ClassName") and x.ClassName().startswith("TH3"))
+def fromTH3(hist):
+  """Convert a TH3 histogram"""
+  return _fromROOT(hist, 3)
@@ -0,0 +1,393 @@
+# coding: utf-8
+
+"""
+histarray.py
+
+Many histograms with identical binning - for instance one per detector
+channel - stored together in a single buffer and filled in one pass.
+
+Create an array of histograms, and fill it with the channel of each entry:
+  >>> a = HistArray(3, [0, 1, 2])
+  >>> a.fill([0, 2, 2], [0.5, 0.5, 1.5])
+  >>> a.contents
+  array([[ 1.,  0.],
+         [ 0.,  0.],
+         [ 1.,  1.]])
+
+Or fill every histogram from the same entries, with a row of weights for
+each - finding the bins only once:
+  >>> a.fill_weights([0.5, 1.5], [[1, 1], [2, 0], [0, 3]])
+
+Each histogram is available as a Hist viewing the shared buffer:
+  >>> a[2]
+  Hist([0, 1, 2], data=[ 1.,  1.])
+  >>> a[2].fill(0.5)
+  >>> a.contents[2]
+  array([ 2.,  1.])
+"""
+
+import numpy
+from .binning import BinningScheme, BinError
+from .hists import (Hist, BinIndex, _SharedContents, _build_axes, _axes_bins, _split_coordinates,
+                    _as_weights, _check_weights, _add_at, _narrow, _largest,
+                    _fill_step, _headroom)
+from . import instrument
+
+class HistArray(object):
+  """A fixed number of histograms sharing the same axes, with contents
+  stored as one array indexed by histogram then bin"""
+  def __init__(self, count, bins, dtype=float, sumw2=False):
+    self._axes = _build_axes(bins)
+    self._bins = _axes_bins(self._axes)
+    self.ndim = len(self._axes)
+    shape = (count,) + tuple(len(x) for x in self._axes)
+    self._contents = numpy.zeros(shape, dtype=dtype)
+    self._sumw2 = numpy.zeros(shape, dtype=dtype) if sumw2 else None
+    self._underflow = numpy.zeros((count, self.ndim), dtype=dtype)
+    self._overflow = numpy.zeros((count, self.ndim), dtype=dtype)
+    self._ids = None
+    # Shared with the histograms viewing the contents, to tell them of changes
+    self._shared = _SharedContents(self)
+
+  @classmethod
+  def _view(cls, source, index):
+    "A HistArray sharing a selection of the histograms of another"
+    view = cls.__new__(cls)
+    view._axes = source._axes
+    view._bins = source._bins
+    view.ndim = source.ndim
+    view._contents = source._contents[index]
+    view._sumw2 = None if source._sumw2 is None else source._sumw2[index]
+    view._underflow = source._underflow[index]
+    view._overflow = source._overflow[index]
+    view._ids = None
+    view._shared = source._shared
+    return view
+
+  def _promote(self):
+    """Widen the storage to 64 bits, in place. Histograms already taken
+    from the array no longer share its contents."""
+    dtype = numpy.dtype(self.dtype.kind + "8")
+    self._contents = self._contents.astype(dtype)
+    if self._sumw2 is not None:
+      self._sumw2 = self._sumw2.astype(dtype)
+    self._underflow = self._underflow.astype(dtype)
+    self._overflow = self._overflow.astype(dtype)
+    self._shared = _SharedContents(self)
+
+  def _id_axis(self):
+    "An axis numbering the histograms, so that entries are binned by id too"
+    if self._ids is None:
+      self._ids = BinningScheme(numpy.arange(len(self)+1))
+    return self._ids
+
+  def _held(self):
+    "Every array of counts: the contents, flows and sumw2"
+    arrays = [self._contents, self._underflow, self._overflow]
+    if self._sumw2 is not None:
+      arrays.append(self._sumw2)
+    return arrays
+
+  def _changing(self, step=None):
+    """Note that the contents are about to change, by at most step in any
+    bin or flow if that is known. Narrow integer storage that might not
+    have room is widened to 64 bits first."""
+    shared = self._shared
+    bound, shared.bound = shared.bound, None
+    shared.version += 1
+    if step is not None and _narrow(self.dtype):
+      try:
+        shared.bound = _headroom(self, bound, self._held(), step)
+      except OverflowError:
+        self._promote()
+
+  @property
+  def bins(self):
+    """The bin edges shared by every histogram; an array for one dimension,
+    otherwise a tuple of arrays for each axis"""
+    return self._bins
+
+  @property
+  def axes(self):
+    """The BinningScheme for each axis of the histograms"""
+    return self._axes
+
+  @property
+  def dtype(self):
+    return self._contents.dtype
+
+  @property
+  def shape(self):
+    "The number of histograms, followed by the number of bins on each axis"
+    return self._contents.shape
+
+  @property
+  def contents(self):
+    "The contents of every histogram, as one array indexed by histogram first"
+    return self._contents
+
+  @property
+  def sumw2(self):
+    "The sum of squared weights, shaped like the contents, or None if not tracked"
+    return self._sumw2
+
+  @property
+  def underflow(self):
+    """Sum of weights below the bins for each histogram; indexed by
+    histogram, then axis for more than one dimension"""
+    return self._underflow[:, 0] if self.ndim == 1 else self._underflow
+
+  @property
+  def overflow(self):
+    """Sum of weights at or above the bins for each histogram; indexed by
+    histogram, then axis for more than one dimension"""
+    return self._overflow[:, 0] if self.ndim == 1 else self._overflow
+
+  def __len__(self):
+    return len(self._contents)
+
+  def __repr__(self):
+    return "{}({}, {})".format(type(self).__name__, len(self),
+      ", ".join(str(x) for x in self.shape[1:]))
+
+  def __getitem__(self, index):
+    """A single histogram as a Hist, or a selection of them as a HistArray,
+    viewing the same contents, sumw2 and flows"""
+    if isinstance(index, (int, numpy.integer)):
+      hist = self._contents[index].view(Hist)
+      hist._axes = self._axes
+      hist._bins = self._bins
+      hist._underflow = self._underflow[index]
+      hist._overflow = self._overflow[index]
+      if self._sumw2 is not None:
+        hist._sumw2 = self._sumw2[index]
+      hist._shared = self._shared
+      return hist
+    if isinstance(index, slice):
+      return HistArray._view(self, index)
+    raise IndexError("Histograms can only be selected by an integer or a slice")
+
+  def __iter__(self):
+    for index in range(len(self)):
+      yield self[index]
+
+  def fill(self, ids, values, weights=None):
+    """Fill the histograms from arrays of entries, in a single pass.
+
+    ids gives the index of the histogram each entry belongs in, and values
+    and weights are as for Hist.fill. Entries outside the bins are added to
+    the flows of their own histogram.
+
+    Narrow integer storage, such as uint32 counts, is widened to 64 bits
+    when the entries could overflow it."""
+    started = instrument.clock() if instrument.enabled else None
+    coordinates = _split_coordinates(values, self.ndim)
+    ids = numpy.asarray(ids, dtype=numpy.intp).ravel()
+    if not ids.shape == coordinates[0].shape:
+      raise ValueError("Need a histogram index for every entry")
+    if len(ids) and (ids.min() < 0 or ids.max() >= len(self)):
+      raise IndexError("Histogram index out of range")
+    weights = _as_weights(weights, ids.shape)
+    _check_weights(weights, self.dtype)
+    index = BinIndex((self._id_axis(),) + self._axes,
+                     [ids] + [axis.index(x) for axis, x in zip(self._axes, coordinates)])
+    step = None
+    if _narrow(self.dtype):
+      step = _fill_step(self.dtype, len(ids), weights, self._sumw2 is not None)
+    self._changing(step)
+
+    # Flows are summed per histogram, on each axis; the ids are all in range
+    for dim, (under, over) in enumerate(zip(index.underflow[1:], index.overflow[1:])):
+      if len(under):
+        self._underflow[:, dim] += self._sum_by_id(ids, under, weights)
+      if len(over):
+        self._overflow[:, dim] += self._sum_by_id(ids, over, weights)
+    if index.inside is not None and weights is not None and weights.ndim > 0:
+      weights = weights[index.inside]
+
+    if weights is None:
+      weights = self.dtype.type(1)
+    elif not weights.dtype == self.dtype:
+      weights = weights.astype(self.dtype)
+    _add_at(self._contents, index.flat, weights)
+    if self._sumw2 is not None:
+      _add_at(self._sumw2, index.flat, weights*weights)
+    if started is not None:
+      instrument.record(self, "fill", index.entries, index.entries - len(index.flat), started)
+
+  def fill_weights(self, values, weights):
+    """Fill every histogram from the same entries, each with its own row
+    of weights; for instance systematic variations, or bootstrap replicas.
+
+    values are as for Hist.fill, or a BinIndex made for the same binning,
+    and weights has a row for each histogram. The bins of the entries are
+    only found once, however many histograms there are."""
+    started = instrument.clock() if instrument.enabled else None
+    if isinstance(values, BinIndex):
+      index = values
+      if not index.matches(self._axes):
+        raise BinError("Bin index was made for different binning")
+    else:
+      coordinates = _split_coordinates(values, self.ndim)
+      index = BinIndex(self._axes, [axis.index(x) for axis, x in zip(self._axes, coordinates)])
+    weights = numpy.asarray(weights)
+    if not weights.shape[0] == len(self) or not weights[0].size == index.entries:
+      raise ValueError("Need a row of weights for each of {} histograms".format(len(self)))
+    weights = weights.reshape(len(self), index.entries)
+    _check_weights(weights, self.dtype)
+    step = None
+    if _narrow(self.dtype):
+      step = _fill_step(self.dtype, index.entries, weights, self._sumw2 is not None)
+    self._changing(step)
+
+    for dim, (under, over) in enumerate(zip(index.underflow, index.overflow)):
+      if len(under):
+        self._underflow[:, dim] += weights[:, under].sum(axis=1).astype(self.dtype, copy=False)
+      if len(over):
+        self._overflow[:, dim] += weights[:, over].sum(axis=1).astype(self.dtype, copy=False)
+    # Summing by bin is far quicker than adding entries one at a time, but
+    # bincount sums in float64, so integer counts are still added exactly
+    bins = self._contents[0].size
+    exact = not self.dtype.kind == "f"
+    for row, row_weights in enumerate(weights):
+      if index.inside is not None:
+        row_weights = row_weights[index.inside]
+      contents = self._contents[row].reshape(-1)
+      if exact:
+        _add_at(contents, index.flat, row_weights.astype(self.dtype))
+      else:
+        contents += numpy.bincount(index.flat, row_weights, bins).astype(self.dtype, copy=False)
+      if self._sumw2 is not None:
+        sumw2 = self._sumw2[row].reshape(-1)
+        if exact:
+          _add_at(sumw2, index.flat, (row_weights*row_weights).astype(self.dtype))
+        else:
+          sumw2 += numpy.bincount(index.flat, row_weights*row_weights, bins).astype(self.dtype, copy=False)
+    if started is not None:
+      outside = index.entries - len(index.flat)
+      instrument.record(self, "fill", len(self)*index.entries, len(self)*outside, started)
+
+  def _sum_by_id(self, ids, mask, weights):
+    "Sum the weights of the entries at some positions, for each histogram"
+    if weights is not None and weights.ndim > 0:
+      sums = numpy.bincount(ids[mask], weights=weights[mask], minlength=len(self))
+    else:
+      sums = numpy.bincount(ids[mask], minlength=len(self))
+      if weights is not None:
+        sums = sums * weights
+    return sums.astype(self.dtype, copy=False)
+
+  def copy(self):
+    other = HistArray._view(self, slice(None))
+    other._contents = self._contents.copy()
+    if self._sumw2 is not None:
+      other._sumw2 = self._sumw2.copy()
+    other._underflow = self._underflow.copy()
+    other._overflow = self._overflow.copy()
+    other._shared = _SharedContents(other)
+    return other
+
+  def compatible(self, other):
+    """Does another HistArray hold as many histograms, with exactly the
+    same binning"""
+    if not self.shape == other.shape:
+      return False
+    return other._axes is self._axes or all(
+      x.fingerprint == y.fingerprint for x, y in zip(self._axes, other._axes))
+
+  def integrals(self):
+    "The sum of the contents of each histogram, excluding the flows"
+    return self._contents.reshape(len(self), -1).sum(axis=1)
+
+  def sum(self):
+    "Add every histogram together into a single Hist"
+    total = Hist(self._axes, data=self._contents.sum(axis=0))
+    if self._sumw2 is not None:
+      total._sumw2 = self._sumw2.sum(axis=0)
+    total._underflow[...] = self._underflow.sum(axis=0)
+    total._overflow[...] = self._overflow.sum(axis=0)
+    return total
+
+  def project(self, axes):
+    """Sum every histogram over all but the given axes, returning a new
+    HistArray. axes is the index of an axis to keep, or a sequence of them."""
+    if numpy.isscalar(axes):
+      axes = [axes]
+    axes = list(axes)
+    summed = tuple(x+1 for x in range(self.ndim) if not x in axes)
+    projected = HistArray(len(self), [self._axes[x] for x in axes], dtype=self.dtype)
+    # Summing leaves the kept axes in ascending order; put them as asked
+    kept = [1 + sorted(axes).index(x) for x in axes]
+    contents = self._contents.sum(axis=summed)
+    projected._contents = numpy.moveaxis(contents, kept, range(1, len(axes)+1)).copy()
+    if self._sumw2 is not None:
+      sumw2 = self._sumw2.sum(axis=summed)
+      projected._sumw2 = numpy.moveaxis(sumw2, kept, range(1, len(axes)+1)).copy()
+    projected._underflow[...] = self._underflow[:, axes]
+    projected._overflow[...] = self._overflow[:, axes]
+    return projected
+
+  def merge(self, others):
+    """Add an iterable of compatible HistArrays into this one, in place.
+    Returns this HistArray."""
+    started = instrument.clock() if instrument.enabled else None
+    merged = 0
+    for other in others:
+      if not self.compatible(other):
+        raise BinError("Cannot merge histogram arrays with different binning")
+      self._changing(_largest(other._held()) if _narrow(self.dtype) else None)
+      if self._sumw2 is None and other._sumw2 is not None:
+        self._sumw2 = numpy.abs(self._contents)
+      self._contents += other._contents
+      if self._sumw2 is not None:
+        self._sumw2 += numpy.abs(other._contents) if other._sumw2 is None else other._sumw2
+      self._underflow += other._underflow
+      self._overflow += other._overflow
+      merged += 1
+    if started is not None:
+      instrument.record(self, "merge", merged, 0, started)
+    return self
+
+  def scale(self, factors):
+    """Multiply the histograms in place, by a single factor or by one
+    factor for each histogram. Returns this HistArray."""
+    factors = numpy.asarray(factors)
+    if factors.ndim > 0:
+      if not factors.shape == (len(self),):
+        raise ValueError("Need one factor for each of {} histograms".format(len(self)))
+      flows = factors[:, numpy.newaxis]
+      factors = factors.reshape((len(self),) + (1,) * self.ndim)
+    else:
+      flows = factors
+    self._changing()
+    self._contents *= factors
+    if self._sumw2 is not None:
+      self._sumw2 *= factors*factors
+    self._underflow *= flows
+    self._overflow *= flows
+    return self
+
+  def __iadd__(self, other):
+    if not isinstance(other, HistArray):
+      return NotImplemented
+    return self.merge([other])
+
+  def __add__(self, other):
+    if not isinstance(other, HistArray):
+      return NotImplemented
+    return self.copy().merge([other])
+
+  def __imul__(self, factors):
+    return self.scale(factors)
+
+  def __mul__(self, factors):
+    return self.copy().scale(factors)
+  __rmul__ = __mul__
+
+  def __itruediv__(self, factors):
+    return self.scale(1. / numpy.asarray(factors))
+
+  def __truediv__(self, factors):
+    return self.copy().scale(1. / numpy.asarray(factors))
+  __div__ = __truediv__
+  __idiv__ = __itruediv__
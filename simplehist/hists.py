@@ -42,6 +42,47 @@ Or from arrays:
   >>> a
   Hist([0, 1, 2, 3], data=[ 0.,  1.,  2.])
 
+Multidimensional histograms take one coordinate array per axis:
+  >>> a = Hist(([0, 1, 2], [0, 10, 20]))
+  >>> a.fill(([0.5, 1.5], [15, 15]))
+  >>> a
+  Hist(([0, 1, 2],[ 0, 10, 20]), data=[[ 0.,  1.],
+         [ 0.,  1.]])
+
+Counts can be kept compactly in narrower storage. Filling raises
+OverflowError rather than wrapping around, and promoted() gives a copy
+with room for more:
+  >>> a = Hist([0, 1, 2], dtype=numpy.uint32)
+  >>> a = a.promoted()
+  >>> a.dtype
+  dtype('uint64')
+
+Filling the same values many times, with different weights, only needs
+their bins found once:
+  >>> index = a.bin_index(values)
+  >>> for weights in variations:
+  ...   a.fill(index, weights)
+
+Values outside the bin range are counted in the underflow and overflow:
+  >>> a = Hist([0,1])
+  >>> a.fill([-10, 1, 5])
+  >>> a.underflow, a.overflow
+  (1.0, 2.0)
+
+Per-bin uncertainties can be tracked by keeping the sum of squared weights:
+  >>> a = Hist([0,1,2], sumw2=True)
+  >>> a.fill([0.5, 0.5, 1.5], weights=[2, 1, 3])
+  >>> a.errors
+  array([ 2.23606798,  3.        ])
+
+Slices are histograms viewing the same contents, with matching bins, and
+can also be taken by coordinate:
+  >>> a = Hist([0, 1, 2, 3], data=[1, 0.2, 3])
+  >>> a[1:]
+  Hist([1, 2, 3], data=[ 0.2,  3. ])
+  >>> a.loc[0.5:1.5]
+  Hist([0, 1, 2], data=[ 1. ,  0.2])
+
 If you use pyROOT, you can convert from 1D histograms:
   >>> type(source)
   <class 'ROOT.TH1D'>
@@ -55,26 +96,366 @@ implementation details.
 You can also draw histograms, using any of the options
 that can be passed to matplotlib.pyplot.plot:
   >>> hist_object.draw_hist(lw=2)
+
+Very large histograms are drawn decimated, keeping their peaks, and many
+histograms can be drawn at once as a single collection:
+  >>> draw_hists(list_of_hists, colors="k", alpha=0.2)
 """
 
-import sys
+import itertools
+import mmap
+import weakref
 import numpy
+from .binning import BinningScheme, BinError
+from . import instrument
+
+# Default number of entries binned at a time when streaming
+DEFAULT_CHUNKSIZE = 1 << 20
+# Most bins drawn as they are; larger histograms are decimated to this many
+DRAW_RESOLUTION = 4096
+
+def _sum_weights(mask, count, weights):
+  "Sum the weights selected by a mask, with count entries selected"
+  if not count:
+    return 0
+  if weights is None:
+    return count
+  if weights.ndim == 0:
+    return count * weights
+  return weights[mask].sum()
+
+def _as_weights(weights, shape):
+  "Validate fill weights, which may be None, a scalar or an array"
+  if weights is None:
+    return None
+  weights = numpy.asarray(weights)
+  if weights.ndim > 0:
+    weights = weights.ravel()
+    if not weights.shape == shape:
+      raise ValueError("Weights must match the shape of the values")
+  return weights
+
+def _check_weights(weights, dtype):
+  """Check that fill weights can be added into storage of a dtype without
+  losing anything, for instance fractional weights into integer counts"""
+  if weights is not None and not numpy.can_cast(weights.dtype, dtype, "same_kind"):
+    raise TypeError("Cannot fill {} weights into {} storage".format(weights.dtype, dtype))
+
+def _add_at(target, flat, weights):
+  """Add weights into an array at flattened bin indices, directly wherever
+  the array layout allows"""
+  if target.ndim == 1:
+    numpy.add.at(target, flat, weights)
+  elif target.flags.c_contiguous:
+    numpy.add.at(target.reshape(-1), flat, weights)
+  else:
+    numpy.add.at(target, numpy.unravel_index(flat, target.shape), weights)
+
+def _fill_partial(axes, dtype, sumw2, coordinates, weights):
+  """Fill a private, empty histogram. Runs inside parallel fill workers,
+  so returns plain arrays that can be passed between processes"""
+  partial = Hist(axes, dtype=dtype, sumw2=sumw2)
+  inside = partial._accumulate([axis.index(x) for axis, x in zip(axes, coordinates)], weights)
+  return (partial.view(numpy.ndarray), partial._underflow, partial._overflow,
+          partial._sumw2, inside)
+
+def _reduce_axis(array, positions, axis):
+  """Sum runs of bins along an axis, between the given edge positions.
+
+  Returns the reduced array, and the totals below and above the edges,
+  all in the storage type of the array. Narrow integer sums are checked
+  to fit, raising OverflowError rather than wrapping around."""
+  dtype = numpy.result_type(array.dtype, numpy.int64) if _narrow(array.dtype) else array.dtype
+  selection = [slice(None)] * array.ndim
+  selection[axis] = slice(None, positions[0])
+  below = array[tuple(selection)].sum(dtype=dtype)
+  selection[axis] = slice(positions[-1], None)
+  above = array[tuple(selection)].sum(dtype=dtype)
+  selection[axis] = slice(None, positions[-1])
+  reduced = numpy.add.reduceat(array[tuple(selection)], positions[:-1], axis=axis, dtype=dtype)
+  if not dtype == array.dtype:
+    limits = numpy.iinfo(array.dtype)
+    if any(x.size and (x.max() > limits.max or x.min() < limits.min)
+           for x in (reduced, numpy.asarray(below), numpy.asarray(above))):
+      raise OverflowError("Rebinned contents don't fit in {} storage".format(array.dtype))
+    reduced = reduced.astype(array.dtype)
+    below, above = array.dtype.type(below), array.dtype.type(above)
+  return reduced, below, above
+
+def _add_flow(flows, axis, amount):
+  """Add to the flow of one axis, raising OverflowError rather than letting
+  narrow integer storage wrap around"""
+  if _narrow(flows.dtype):
+    limits = numpy.iinfo(flows.dtype)
+    if not limits.min <= int(flows[axis]) + int(amount) <= limits.max:
+      raise OverflowError("Rebinned flows don't fit in {} storage".format(flows.dtype))
+  flows[axis] += amount
+
+def _pairwise_sum(hists, check):
+  """Sum an iterable of histograms as a binary tree, keeping only one
+  partial sum per level. Returns the total, or None for an empty
+  iterable, and the number of histograms summed"""
+  stack = []
+  count = 0
+  for hist in hists:
+    check(hist)
+    count += 1
+    partial, level = hist.copy(), 0
+    while stack and stack[-1][0] == level:
+      lower = stack.pop()[1]
+      lower._add_contents(partial)
+      partial, level = lower, level + 1
+    stack.append((level, partial))
+  if not stack:
+    return None, 0
+  total = stack.pop()[1]
+  while stack:
+    partial = stack.pop()[1]
+    partial._add_contents(total)
+    total = partial
+  return total, count
+
+def sum_hists(hists, tree=False):
+  """Sum an iterable of identically binned histograms into a new one.
+
+  See Hist.merge for details."""
+  hists = iter(hists)
+  try:
+    total = next(hists).copy()
+  except StopIteration:
+    raise ValueError("Need at least one histogram to sum")
+  return total.merge(hists, tree=tree)
+
+def _outline(hist, resolution):
+  """The x and y points of the outline of a 1D histogram.
+
+  With more bins than resolution, adjacent bins are grouped into
+  resolution blocks and only the lowest and highest bin of each block
+  are kept, in order, so that peaks and dips survive decimation."""
+  edges = numpy.asarray(hist.bins, dtype=float)
+  contents = hist.view(numpy.ndarray)
+  if resolution is None or len(contents) <= resolution:
+    return numpy.repeat(edges, 2)[1:-1], numpy.repeat(contents, 2)
+  size = -(-len(contents) // resolution)
+  blocks = -(-len(contents) // size)
+  # Padding with the last bin leaves the extremes of the last block alone
+  padded = numpy.empty(blocks*size, dtype=contents.dtype)
+  padded[:len(contents)] = contents
+  padded[len(contents):] = contents[-1]
+  padded = padded.reshape(blocks, size)
+  offsets = numpy.arange(blocks) * size
+  lowest = offsets + padded.argmin(axis=1)
+  highest = offsets + padded.argmax(axis=1)
+  first = numpy.minimum(lowest, highest)
+  second = numpy.maximum(lowest, highest)
+  positions = numpy.empty(2*blocks, dtype=int)
+  positions[0::2] = first
+  positions[1::2] = numpy.minimum(second, len(contents)-1)
+  # Points span the kept bins, from the low edge of the first to the high edge of the second
+  x = numpy.empty(2*blocks)
+  x[0::2] = edges[positions[0::2]]
+  x[1::2] = edges[positions[1::2]+1]
+  return x, contents[positions]
+
+def draw_hists(hists, resolution=DRAW_RESOLUTION, axes=None, **kwargs):
+  """Draw the outlines of many 1D histograms as a single collection, which
+  is far quicker than drawing each with draw_hist.
+
+  Very large histograms are decimated to at most resolution blocks of
+  bins (None to disable), keeping the extremes of each. Other keyword
+  arguments are passed to matplotlib.collections.LineCollection, and
+  axes defaults to the current axes. Returns the collection."""
+  import matplotlib.pyplot as plt
+  from matplotlib.collections import LineCollection
+  if axes is None:
+    axes = plt.gca()
+  lines = []
+  for hist in hists:
+    assert hist.ndim == 1
+    x, y = _outline(hist, resolution)
+    lines.append(numpy.column_stack([x, y]))
+  collection = LineCollection(lines, **kwargs)
+  axes.add_collection(collection)
+  axes.autoscale_view()
+  return collection
+
+def _table_position(axis, limit, index, default):
+  """Locate an integration limit in a cumulative table along an axis, as a
+  table position and the fraction of the way to the next one"""
+  if limit is None:
+    limit = default
+    index = True
+  if index:
+    position = numpy.clip(numpy.asarray(limit, dtype=numpy.intp), 0, len(axis))
+    return position, numpy.zeros(position.shape)
+  limit = numpy.asarray(limit, dtype=float)
+  position = numpy.clip(numpy.searchsorted(axis.edges, limit, side="right") - 1, 0, len(axis) - 1)
+  fraction = (limit - axis.lowedges[position]) / axis.widths[position]
+  return position, numpy.clip(fraction, 0, 1)
+
+def _interpolate(table, points):
+  """Interpolate a cumulative table multilinearly, at a (position, fraction)
+  point on every axis"""
+  total = 0
+  for corner in itertools.product((0, 1), repeat=len(points)):
+    weight = 1
+    index = []
+    for (position, fraction), step in zip(points, corner):
+      weight = weight * (fraction if step else 1 - fraction)
+      # Past the last edge the fraction is zero, so any valid position does
+      index.append(numpy.minimum(position + step, table.shape[len(index)] - 1))
+    total = total + weight * table[tuple(index)]
+  return total
+
+def _file_backed(array):
+  "Is an array a view onto a memory-mapped file"
+  while array is not None:
+    if isinstance(array, (numpy.memmap, mmap.mmap)):
+      return True
+    array = getattr(array, "base", None)
+  return False
+
+# Positions of no entries, for axes without any flows
+_NO_ENTRIES = numpy.zeros(0, dtype=numpy.intp)
+
+class _SharedContents(object):
+  """What is known about a buffer of contents, shared between a histogram
+  and every view onto it; version changes whenever any of them does.
+
+  For narrow integer storage, bound is a known limit on the size of
+  everything held by owner (its contents, flows and sumw2), or None."""
+  __slots__ = ["version", "bound", "owner"]
+  def __init__(self, owner):
+    self.version = 0
+    self.bound = None
+    self.owner = weakref.ref(owner)
+
+def _narrow(dtype):
+  "Is a dtype integer storage that could overflow in practice"
+  return dtype.kind in "iu" and dtype.itemsize < 8
+
+def _largest(arrays):
+  "The largest size of anything in a list of arrays, on either side of zero"
+  return max(max(int(x.max()), -int(x.min())) if x.size else 0 for x in arrays)
+
+def _fill_step(dtype, entries, weights, squared):
+  """The most that filling entries can add to any bin or flow of narrow
+  integer storage, or to its sumw2 if squared. Unsigned storage can't
+  take negative weights, so these raise ValueError."""
+  largest = 1
+  if weights is not None:
+    if not weights.size:
+      return 0
+    if dtype.kind == "u" and weights.min() < 0:
+      raise ValueError("Cannot fill negative weights into {} storage".format(dtype))
+    largest = int(numpy.abs(weights).max())
+  if squared:
+    largest = largest * largest
+  return entries * largest
+
+def _headroom(holder, bound, arrays, step):
+  """Check that adding up to step to everything in arrays (the contents,
+  flows and sumw2 of holder) can't overflow narrow integer storage, either
+  way, raising OverflowError if it might.
+
+  bound is the limit last known for the shared contents of holder, and
+  the new one is returned. Only the owner of the contents relies on it;
+  anything viewing them checks its own arrays in full, as its flows (and
+  the rest of the contents) are not the same as the owner's."""
+  limit = int(numpy.iinfo(arrays[0].dtype).max)
+  owner = holder._shared.owner() is holder
+  if owner and bound is not None and bound + step <= limit:
+    return bound + step
+  largest = _largest(arrays)
+  if largest + step > limit:
+    raise OverflowError("Adding up to {} could overflow {} storage".format(step, arrays[0].dtype))
+  if owner:
+    return largest + step
+  return None if bound is None else bound + step
+
+# Arithmetic that propagates flows and sumw2 into the result
+_ADDITIVE = (numpy.add, numpy.subtract)
+_ARITHMETIC = _ADDITIVE + (numpy.multiply, numpy.true_divide)
+
+def _propagate(ufunc, inputs):
+  """Work out the flows and sumw2 for the result of an arithmetic ufunc,
+  before it is applied. Flows are treated as extra bins, and variances
+  are combined with the usual uncorrelated error propagation.
+
+  Returns (underflow, overflow, sumw2), any of which may be None."""
+  if not (ufunc in _ARITHMETIC and len(inputs) == 2):
+    return (None, None, None)
+  additive = ufunc in _ADDITIVE
+  tracked = any(isinstance(x, Hist) and x._sumw2 is not None for x in inputs)
+  values, variances, flows = [], [], []
+  for operand in inputs:
+    if isinstance(operand, Hist):
+      values.append(operand.view(numpy.ndarray))
+      flows.append((operand._underflow, operand._overflow))
+      # Histograms without sumw2 are treated as unweighted counts
+      if operand._sumw2 is None:
+        variances.append(numpy.abs(values[-1]))
+      else:
+        variances.append(operand._sumw2)
+    else:
+      # Constants: Don't affect additive flows, but do scale them
+      values.append(numpy.asarray(operand))
+      variances.append(0)
+      if additive:
+        flows.append((0, 0))
+      elif values[-1].ndim == 0:
+        flows.append((values[-1], values[-1]))
+      else:
+        flows.append(None)
+
+  underflow, overflow = None, None
+  with numpy.errstate(divide="ignore", invalid="ignore"):
+    if all(x is not None for x in flows):
+      underflow = ufunc(flows[0][0], flows[1][0])
+      overflow = ufunc(flows[0][1], flows[1][1])
+    if not tracked:
+      return (underflow, overflow, None)
+    (x, y), (varx, vary) = values, variances
+    if additive:
+      sumw2 = varx + vary
+    elif ufunc is numpy.multiply:
+      sumw2 = y*y*varx + x*x*vary
+    else:
+      sumw2 = (varx + x*x*vary/(y*y)) / (y*y)
+  return (underflow, overflow, sumw2)
+
+def _split_coordinates(values, ndim):
+  "Split fill values into a flat coordinate array for each of ndim axes"
+  if ndim == 1:
+    return [numpy.asarray(values).ravel()]
+  if not len(values) == ndim:
+    raise ValueError("Need coordinates for each of {} axes".format(ndim))
+  coordinates = [numpy.asarray(x).ravel() for x in values]
+  if not all(x.shape == coordinates[0].shape for x in coordinates):
+    raise ValueError("Coordinate arrays for every axis must match in length")
+  return coordinates
+
+def _build_axes(bins):
+  """Create and validate the binning scheme of every axis, from either a
+  single set of bins or a sequence of them. Existing BinningScheme
+  objects are shared rather than copied."""
+  if isinstance(bins, BinningScheme) or numpy.ndim(bins[0]) == 0:
+    bins = [bins]
+  return tuple(x if isinstance(x, BinningScheme) else BinningScheme(x) for x in bins)
+
+def _axes_bins(axes):
+  "The bins attribute for a set of axes"
+  if len(axes) == 1:
+    return axes[0].edges
+  return tuple(x.edges for x in axes)
 
 # A numpy array with bins, and constraints on those bins
 class Hist(numpy.ndarray):
-  def __new__(cls, bins, data=None, **kwargs):
-    # If bins contains items that are list-like then it is probably multidim
-    if isinstance(bins[0], (tuple, list)):
-      # It must be multi-dimension...
-      bins = tuple(numpy.asarray(x) for x in bins)
-      ndims = len(bins)
-      shape = tuple(len(x)-1 for x in bins)
-    else:
-      # Just a single dimension
-      bins = numpy.asarray(bins)
-      assert bins.ndim == 1
-      ndims = 1
-      shape = (len(bins)-1,)
+  def __new__(cls, bins, data=None, sumw2=None, **kwargs):
+    # If bins contains items that are list-like then it is multidim
+    axes = _build_axes(bins)
+    ndims = len(axes)
+    shape = tuple(len(x) for x in axes)
 
     # Create or validate the data shape
     if data is None:
@@ -84,14 +465,13 @@ class Hist(numpy.ndarray):
       data = numpy.asarray(data, **kwargs)
       # Same dimensions and shape-1
       assert ndims == data.ndim
-      if ndims == 1:
-        assert all(x == len(y)-1 for x, y in zip(data.shape, [bins]))
-      else:
-        assert all(x == len(y)-1 for x, y in zip(data.shape, bins))
+      assert data.shape == shape
 
     # Cast from our data array
     obj = data.view(cls)
-    obj._bins = bins
+    obj._bins = _axes_bins(axes)
+    obj._axes = axes
+    obj.sumw2 = sumw2
     return obj
 
   def __array_finalize__(self, obj):
@@ -99,61 +479,210 @@ class Hist(numpy.ndarray):
     assert obj is not None
     # Other should always have a _bins object
     self._bins = getattr(obj,"_bins",None)
+    self._axes = getattr(obj, "_axes", None)
+    # Flows are copied, so that derived histograms don't share counters
+    underflow = getattr(obj, "_underflow", None)
+    overflow = getattr(obj, "_overflow", None)
+    if underflow is None or not len(underflow) == self.ndim:
+      self._underflow = numpy.zeros(self.ndim, dtype=self.dtype)
+      self._overflow = numpy.zeros(self.ndim, dtype=self.dtype)
+    else:
+      self._underflow = underflow.copy()
+      self._overflow = overflow.copy()
+    # A matching shape doesn't mean matching bins (a transpose keeps it),
+    # so sumw2 is only carried over by copy() and arithmetic
+    self._sumw2 = None
+    # Views onto the contents of another histogram learn of its changes
+    shared = getattr(obj, "_shared", None)
+    if shared is None or not numpy.may_share_memory(self, obj):
+      shared = _SharedContents(self)
+    self._shared = shared
+    # Sums of the contents are cached per histogram, for one version
+    self._cumulative = None
 
-  def __array_wrap__(self,obj,context=None):
+  def __array_wrap__(self,obj,context=None,return_scalar=False):
     # if obj.ndim == 0 and obj.size == 1:
     #   return obj.item()
     # Don't wrap as a hist if the shape changed - we have no idea how it did so
     if not obj.shape == self.shape:
-      return obj
+      return obj[()] if return_scalar else obj
     return super(Hist,self).__array_wrap__(obj,context)
 
+  def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+    # Run the ufunc on plain arrays, then rewrap anything still the same
+    # shape as a histogram, carrying the flows and sumw2 along
+    arrays = [x.view(numpy.ndarray) if isinstance(x, Hist) else x for x in inputs]
+    out = kwargs.get("out", ())
+    if out:
+      kwargs["out"] = tuple(x.view(numpy.ndarray) if isinstance(x, Hist) else x for x in out)
+    if method == "__call__":
+      underflow, overflow, sumw2 = _propagate(ufunc, inputs)
+    else:
+      underflow, overflow, sumw2 = None, None, None
+
+    results = getattr(ufunc, method)(*arrays, **kwargs)
+    for changed in out:
+      if isinstance(changed, Hist):
+        changed._invalidate()
+    if method == "at":
+      if isinstance(inputs[0], Hist):
+        inputs[0]._invalidate()
+      return None
+    if ufunc.nout == 1:
+      results = (results,)
+    wrapped = []
+    for i, result in enumerate(results):
+      if i < len(out) and out[i] is not None:
+        result = out[i]
+        if not isinstance(result, Hist):
+          wrapped.append(result)
+          continue
+      elif isinstance(result, numpy.ndarray) and result.shape == self.shape:
+        result = result.view(type(self))
+        result._bins = self._bins
+        result._axes = self._axes
+      else:
+        wrapped.append(result)
+        continue
+      if underflow is None:
+        result._underflow[...] = 0
+        result._overflow[...] = 0
+      else:
+        result._underflow[...] = underflow
+        result._overflow[...] = overflow
+      if sumw2 is None or result._sumw2 is None:
+        result._sumw2 = sumw2
+      else:
+        result._sumw2[...] = sumw2
+      wrapped.append(result)
+    return wrapped[0] if ufunc.nout == 1 else tuple(wrapped)
+
+  def copy(self, order="C"):
+    "A copy of the histogram, including its flows and sumw2"
+    other = super(Hist, self).copy(order)
+    if self._sumw2 is not None:
+      other._sumw2 = self._sumw2.copy()
+    return other
+
+  def __copy__(self):
+    return self.copy()
+
+  def __deepcopy__(self, memo):
+    return self.copy()
+
   @property
   def bins(self):
-      return self._bins
+    """The bin edges; an array for one dimension, otherwise a tuple of
+    arrays for each axis"""
+    return self._bins
   @bins.setter
   def bins(self, value):
-    value = numpy.asarray(value)
-    assert value.ndim == self.ndim
-    assert all(x == y-1 for x, y in zip(self.shape, value.shape))
-    self._bins = value
+    axes = _build_axes(value)
+    assert len(axes) == self.ndim
+    assert self.shape == tuple(len(x) for x in axes)
+    self._axes = axes
+    self._bins = _axes_bins(axes)
+
+  @property
+  def sumw2(self):
+    """The sum of squared weights in each bin, or None if not tracked.
+
+    Set True to start tracking, treating the current contents as
+    unweighted counts, or None to stop tracking."""
+    return self._sumw2
+  @sumw2.setter
+  def sumw2(self, value):
+    self._shared.bound = None
+    if value is None or value is False:
+      self._sumw2 = None
+    elif value is True:
+      self._sumw2 = numpy.array(self.view(numpy.ndarray))
+    else:
+      value = numpy.array(value, dtype=self.dtype)
+      assert value.shape == self.shape
+      self._sumw2 = value
+
+  @property
+  def errors(self):
+    """The statistical uncertainty on each bin; the square root of sumw2
+    if tracked, otherwise assuming unweighted counts"""
+    if self._sumw2 is None:
+      return numpy.sqrt(numpy.abs(self.view(numpy.ndarray)))
+    return numpy.sqrt(self._sumw2)
+
+  @property
+  def axes(self):
+    """The BinningScheme for each axis of the histogram"""
+    return self._axes
 
   def __getitem__(self, index):
     """Return a value, or a subhist from a slice.
 
     Getting singular indices just returns the values, whilst slices return
-    subhists, with applicable bins."""
-
-    return super(Hist, self).__getitem__(index)
-
-    if isinstance(index, tuple) and self.ndim == 1:
-      binSel = []
-      # Build a new tuple for each of the entries
-      for selection in index:
-        if selection is Ellipsis:
-          binSel.append(Ellipsis)
-        elif isinstance(selection, slice):
-          # Stepping really doesn't make much sense with bins
-          assert selection.step is None or selection.step == 1
-          if selection.stop is not None:
-            binSel.append(slice(selection.start, min(sys.maxint,selection.stop+1)))
-          else:
-            binSel.append(slice(selection.start, None))
-        elif isinstance(selection, int):
-          binSel.append(slice(selection, selection+1))
-        else:
-          # Throw away the hist information as we don't understand the request
-          return super(Hist, self).__getitem__(index).view(numpy.ndarray)
-          #assert False
-      # Build a new histogram with these bins
-      ret = super(Hist,self).__getitem__(index).view(Hist)
-      # If this gave us a hist.. 
-      if hasattr(ret, "_bins"):
-        ret._bins = self._bins.__getitem__(tuple(binSel))
+    subhists, with applicable bins. Subhists are views sharing the contents
+    and sumw2 of this histogram, but start with empty flows. Indexing that
+    doesn't select a contiguous block of bins (steps, index arrays, masks
+    or empty ranges) returns a plain array."""
+    ret = self.view(numpy.ndarray)[index]
+    if not isinstance(ret, numpy.ndarray):
       return ret
-  
-    else:
-      return super(Hist, self).__getitem__(index)
+    axes = self._sliced_axes(index)
+    if axes is None:
+      return ret
+    ret = ret.view(Hist)
+    ret._axes = axes
+    ret._bins = _axes_bins(axes)
+    ret._underflow = numpy.zeros(ret.ndim, dtype=ret.dtype)
+    ret._overflow = numpy.zeros(ret.ndim, dtype=ret.dtype)
+    if self._sumw2 is not None:
+      ret._sumw2 = self._sumw2[index]
+    ret._shared = self._shared
+    return ret
+
+  def __setitem__(self, index, value):
+    self._invalidate()
+    super(Hist, self).__setitem__(index, value)
+
+  def _sliced_axes(self, index):
+    """Work out the axes left by basic indexing, or None if the index
+    doesn't leave a histogram. Integer indices remove their axis."""
+    if not isinstance(index, tuple):
+      index = (index,)
+    # New axes have no bins
+    if any(x is None for x in index):
+      return None
+    ellipses = [i for i, x in enumerate(index) if x is Ellipsis]
+    if ellipses:
+      position = ellipses[0]
+      expanded = (slice(None),) * (self.ndim - len(index) + 1)
+      index = index[:position] + expanded + index[position+1:]
+    index = index + (slice(None),) * (self.ndim - len(index))
+    axes = []
+    for selection, axis in zip(index, self._axes):
+      if isinstance(selection, slice):
+        start, stop, step = selection.indices(len(axis))
+        # Stepping really doesn't make much sense with bins, and a
+        # histogram needs at least one
+        if not step == 1 or stop <= start:
+          return None
+        axes.append(axis.subset(slice(start, stop+1)))
+      elif isinstance(selection, (int, numpy.integer)) and not isinstance(selection, bool):
+        continue
+      else:
+        return None
+    if not axes:
+      return None
+    return tuple(axes)
+
+  @property
+  def loc(self):
+    """Select bins by coordinate rather than by index.
+
+    h.loc[2.5:7] selects from the bin containing 2.5 up to the bin
+    containing 7 (excluding a bin starting exactly at 7), and h.loc[2.5]
+    the single bin containing 2.5. Multidimensional histograms take a
+    selection for each axis."""
+    return _CoordinateIndexer(self)
 
   def __getslice__(self, i, j):
     return self.__getitem__((slice(i,j),))
@@ -172,46 +701,543 @@ class Hist(numpy.ndarray):
         ",".join([numpy.array_repr(x)[6:-1] for x in self._bins]), 
         numpy.array_repr(self)[len(type(self).__name__)+1:-1])
 
+  @property
+  def underflow(self):
+    """Sum of weights filled below the lowest bin edge.
+
+    For multidimensional histograms this is an array holding the
+    underflow on each axis separately."""
+    if self.ndim == 1:
+      return self._underflow[0]
+    return self._underflow
+  @underflow.setter
+  def underflow(self, value):
+    self._shared.bound = None
+    self._underflow[...] = value
+
+  @property
+  def overflow(self):
+    """Sum of weights filled at or above the highest bin edge.
+
+    For multidimensional histograms this is an array holding the
+    overflow on each axis separately."""
+    if self.ndim == 1:
+      return self._overflow[0]
+    return self._overflow
+  @overflow.setter
+  def overflow(self, value):
+    self._shared.bound = None
+    self._overflow[...] = value
+
   def fill(self, values, weights=None):
-    values = numpy.asarray(values)
-    if weights is not None:
-      weights = numpy.asarray(weights)
+    """Fill the histogram from a value, or an array of values.
+
+    Multidimensional histograms take one coordinate array per axis, either
+    as a sequence or as an (N, M) array for M entries. Entries are
+    accumulated directly into the histogram contents. Anything falling
+    outside the binned range on an axis is added to the underflow or
+    overflow for that axis instead. values may also be a BinIndex from
+    bin_index, to skip finding the bins."""
+    started = instrument.clock() if instrument.enabled else None
+    if isinstance(values, BinIndex):
+      index = self._check_index(values)
+    else:
+      coordinates = self._coordinates(values)
+      index = BinIndex(self._axes, [axis.index(x) for axis, x in zip(self._axes, coordinates)])
+    weights = _as_weights(weights, index.shape)
+    inside = self._fill_index(index, weights)
+    if started is not None:
+      instrument.record(self, "fill", index.entries, index.entries - inside, started)
+
+  def bin_index(self, values):
+    """Work out the bins of values once, so that they can be filled any
+    number of times (with different weights) without searching the bins
+    again. Takes values as for fill, and returns a BinIndex that fill
+    accepts in their place, as do any histograms binned identically."""
+    coordinates = self._coordinates(values)
+    return BinIndex(self._axes, [axis.index(x) for axis, x in zip(self._axes, coordinates)])
+
+  def _check_index(self, index):
+    if not index.matches(self._axes):
+      raise BinError("Bin index was made for different binning")
+    return index
+
+  def fill_iter(self, source, weights=None, chunksize=None, callback=None):
+    """Fill from a data source that may be too large to hold in memory.
+
+    source is either a whole data set as a numpy array (for example a
+    numpy.memmap, with one row per axis for more than one dimension), or
+    any other iterable - including a list - yielding batches of values in
+    any form accepted by fill. weights may be None, a scalar, or else match
+    the source: an array for a data set, or an iterable of batches for an
+    iterable source.
+
+    Data is filled at most chunksize entries at a time, so that memory use
+    is bounded by the chunk size rather than the size of the data. If
+    given, callback(entries, total) is called after every chunk with the
+    number of entries filled so far, and the total number of entries (or
+    None for an iterable source). Returns the number of entries filled."""
+    chunksize = chunksize or DEFAULT_CHUNKSIZE
+    if isinstance(source, numpy.ndarray):
+      batches = [(source, weights)]
+      total = numpy.size(self._split_batch(source)[0])
+    else:
+      # Looking at the dimensions of a list would read every batch of it
+      if weights is None or numpy.isscalar(weights) or getattr(weights, "ndim", None) == 0:
+        batches = ((x, weights) for x in source)
+      else:
+        batches = zip(source, weights)
+      total = None
+
+    entries = 0
+    for values, batch_weights in batches:
+      coordinates = self._split_batch(values)
+      length = len(coordinates[0])
+      scalar_weights = batch_weights is None or numpy.ndim(batch_weights) == 0
+      if not scalar_weights and not len(batch_weights) == length:
+        raise ValueError("Weights must match the shape of the values")
+      for start in range(0, length, chunksize):
+        chunk = [x[start:start+chunksize] for x in coordinates]
+        if scalar_weights:
+          chunk_weights = batch_weights
+        else:
+          chunk_weights = batch_weights[start:start+chunksize]
+        self.fill(chunk[0] if self.ndim == 1 else chunk, chunk_weights)
+        entries += numpy.size(chunk[0])
+        if callback is not None:
+          callback(entries, total)
+    return entries
+
+  def fill_parallel(self, values, weights=None, workers=None, executor="thread"):
+    """Fill from a large array of values using several workers at once.
+
+    The entries are split into one contiguous block per worker, and each
+    block is filled into a private partial histogram with the same bins.
+    The partials are then added into this histogram in block order, so the
+    result is deterministic for a given number of workers.
+
+    executor may be "thread" (numpy releases the GIL while binning),
+    "process", or an existing concurrent.futures.Executor to use. workers
+    defaults to the number of CPUs."""
+    import concurrent.futures
+    import multiprocessing
+    started = instrument.clock() if instrument.enabled else None
+    coordinates = self._coordinates(values)
+    weights = _as_weights(weights, coordinates[0].shape)
+    if workers is None:
+      workers = multiprocessing.cpu_count()
+    entries = len(coordinates[0])
+    blocks = max(1, min(workers, entries))
+    edges = numpy.linspace(0, entries, blocks+1).astype(int)
+    jobs = []
+    for start, stop in zip(edges[:-1], edges[1:]):
+      block_weights = weights
+      if weights is not None and weights.ndim > 0:
+        block_weights = weights[start:stop]
+      jobs.append(([x[start:stop] for x in coordinates], block_weights))
+
+    if executor == "thread":
+      pool = concurrent.futures.ThreadPoolExecutor(blocks)
+    elif executor == "process":
+      pool = concurrent.futures.ProcessPoolExecutor(blocks)
+    else:
+      pool = executor
+    self._reserve(entries, weights)
+    try:
+      tracked = self._sumw2 is not None
+      futures = [pool.submit(_fill_partial, self._axes, self.dtype, tracked, coords, block_weights)
+                 for coords, block_weights in jobs]
+      # Reduce in submission order, regardless of which finished first
+      inside = 0
+      for future in futures:
+        contents, underflow, overflow, sumw2, count = future.result()
+        self.view(numpy.ndarray)[...] += contents
+        self._underflow += underflow
+        self._overflow += overflow
+        if tracked:
+          self._sumw2 += sumw2
+        inside += count
+    finally:
+      if pool is not executor:
+        pool.shutdown()
+    if started is not None:
+      instrument.record(self, "fill", entries, entries - inside, started)
+
+  def integral(self, lo=None, hi=None, index=False):
+    """The sum of the contents between two points, excluding the flows.
+
+    lo and hi are coordinates, with None for the edge of the bins, or a
+    coordinate for each axis of a multidimensional histogram; either may
+    also be an array of them, to integrate many ranges at once. Bins cut by
+    a limit contribute in proportion to the part of their width inside it.
+    With index=True the limits are instead bin indices, and the range
+    includes lo but not hi, as with a slice.
+
+    Uses a cached table of cumulative sums, so each range costs the same
+    however many bins it covers."""
+    table = self._summed_area()
+    lows, highs = self._limits(lo), self._limits(hi)
+    points = [(_table_position(axis, low, index, 0), _table_position(axis, high, index, len(axis)))
+              for axis, low, high in zip(self._axes, lows, highs)]
+    # Inclusion-exclusion over the corners of the box
+    total = 0
+    for corner in itertools.product((0, 1), repeat=self.ndim):
+      sign = (-1) ** (self.ndim - sum(corner))
+      total = total + sign * _interpolate(table, [x[c] for x, c in zip(points, corner)])
+    return total
+
+  def cdf(self):
+    """The cumulative distribution of the contents, excluding the flows,
+    as a histogram with the same bins. Each bin holds the fraction of the
+    total contents up to its upper edge (on every axis)."""
+    table = self._summed_area()
+    inner = table[(slice(1, None),) * self.ndim]
+    return Hist(self._axes, data=inner / float(table[(-1,) * self.ndim]))
+
+  def quantile(self, q):
+    """The coordinate below which a fraction q of the contents lie,
+    excluding the flows, interpolating linearly within bins. q may be an
+    array of fractions. Only for 1D histograms."""
+    if not self.ndim == 1:
+      raise ValueError("Quantiles are only defined for one dimension")
+    table = self._summed_area()
+    q = numpy.asarray(q, dtype=float)
+    if numpy.any((q < 0) | (q > 1)):
+      raise ValueError("Quantiles must be between 0 and 1")
+    target = q * table[-1]
+    position = numpy.clip(numpy.searchsorted(table, target, side="left") - 1, 0, len(self) - 1)
+    low, high = table[position], table[position+1]
+    content = high - low
+    fraction = numpy.where(content > 0, (target - low) / numpy.where(content > 0, content, 1), 0)
+    return self._axes[0].lowedges[position] + numpy.clip(fraction, 0, 1) * self._axes[0].widths[position]
+
+  def _summed_area(self):
+    """The cumulative sums of the contents along every axis, with a row of
+    zeros before the first bin on each. Built once, until the contents
+    next change, through this histogram or any sharing its contents."""
+    version = self._shared.version
+    if self._cumulative is None or not self._cumulative[0] == version:
+      table = numpy.zeros(tuple(x+1 for x in self.shape),
+                          dtype=numpy.result_type(self.dtype, numpy.int64))
+      table[(slice(1, None),) * self.ndim] = self.view(numpy.ndarray)
+      for axis in range(self.ndim):
+        numpy.cumsum(table, axis=axis, out=table)
+      self._cumulative = (version, table)
+    return self._cumulative[1]
+
+  def _limits(self, limits):
+    "Split integration limits into one for each axis"
+    if self.ndim == 1 or limits is None:
+      return [limits] * self.ndim
+    if not len(limits) == self.ndim:
+      raise ValueError("Need a limit for each of {} axes".format(self.ndim))
+    return list(limits)
+
+  def _invalidate(self):
+    """Note a change to the contents, so that cached sums of them are
+    rebuilt by this histogram and any sharing them, and forget the bound
+    on their size"""
+    self._shared.version += 1
+    self._shared.bound = None
+
+  def _held(self):
+    """The arrays of counts held by the histogram; the contents, flows and
+    sumw2, unless that is kept as floating point"""
+    arrays = [self.view(numpy.ndarray), self._underflow, self._overflow]
+    if self._counts_sumw2():
+      arrays.append(self._sumw2)
+    return arrays
+
+  def _counts_sumw2(self):
+    "Is sumw2 tracked in the same (integer) storage as the contents"
+    return self._sumw2 is not None and self._sumw2.dtype == self.dtype
+
+  def _reserve(self, entries, weights):
+    """Prepare to add entries into the contents, checking that narrow
+    integer storage has room for them"""
+    bound = self._shared.bound
+    self._invalidate()
+    if _narrow(self.dtype):
+      step = _fill_step(self.dtype, entries, weights, self._counts_sumw2())
+      self._shared.bound = _headroom(self, bound, self._held(), step)
+
+  def promoted(self):
+    """A copy of the histogram with 64-bit storage, for when the contents
+    outgrow a narrower type; uint32 counts become uint64, and float32
+    weights become float64"""
+    dtype = numpy.dtype(self.dtype.kind + "8")
+    wider = Hist(self._axes, data=self.view(numpy.ndarray).astype(dtype))
+    wider._underflow[...] = self._underflow
+    wider._overflow[...] = self._overflow
+    if self._sumw2 is not None:
+      wider._sumw2 = self._sumw2.astype(numpy.promote_types(self._sumw2.dtype, dtype))
+    return wider
+
+  def rebin(self, bins):
+    """Returns a coarser histogram, combining the existing bin contents.
+
+    For a 1D histogram, bins is either an integer number of adjacent bins
+    to combine, or a new set of edges which must all be existing edges.
+    Contents outside of new edges are moved into the underflow or
+    overflow. Multidimensional histograms take either a single factor for
+    every axis, or a sequence with an entry for each axis (where None
+    leaves that axis unchanged)."""
+    if self.ndim == 1:
+      requests = [bins]
+    elif numpy.isscalar(bins):
+      requests = [bins] * self.ndim
     else:
-      weights = numpy.ones(values.shape)
-    assert values.shape == weights.shape
-
-    # Promote scalars, if required
-    if values.ndim == 0:
-      values = values[numpy.newaxis]
-      weights = weights[numpy.newaxis]
-    bins = numpy.digitize(values, self._bins)
-    newValues = numpy.zeros(self.shape)
-    # Now fill all the bins
-    for _bin, weight in zip(bins, weights):
-      if _bin < 1 or _bin > len(newValues):
+      requests = list(bins)
+      if not len(requests) == self.ndim:
+        raise ValueError("Need rebinning for each of {} axes".format(self.ndim))
+
+    contents = self.view(numpy.ndarray)
+    sumw2 = self._sumw2
+    underflow = self._underflow.copy()
+    overflow = self._overflow.copy()
+    axes = []
+    for axis, (scheme, request) in enumerate(zip(self._axes, requests)):
+      if request is None:
+        axes.append(scheme)
         continue
-      newValues[_bin-1] += weight
-    # add to the current instance
-    self += newValues
+      positions = scheme.rebin_indices(request)
+      axes.append(scheme.subset(positions))
+      contents, below, above = _reduce_axis(contents, positions, axis)
+      _add_flow(underflow, axis, below)
+      _add_flow(overflow, axis, above)
+      if sumw2 is not None:
+        sumw2 = _reduce_axis(sumw2, positions, axis)[0]
+
+    rebinned = Hist(axes, data=contents)
+    rebinned._underflow[...] = underflow
+    rebinned._overflow[...] = overflow
+    if sumw2 is not None:
+      rebinned._sumw2 = sumw2 if sumw2 is not self._sumw2 else sumw2.copy()
+    return rebinned
+
+  def compatible(self, other):
+    """Does another histogram have exactly the same binning as this one.
+
+    Compares cached digests of the edges, so repeated checks against the
+    same histograms are cheap."""
+    if other._axes is self._axes:
+      return True
+    return self.shape == other.shape and all(
+      x.fingerprint == y.fingerprint for x, y in zip(self._axes, other._axes))
+
+  def merge(self, hists, tree=False):
+    """Add an iterable of identically binned histograms into this one.
+
+    Contents, flows and sumw2 are accumulated in place. With tree=True
+    the inputs are summed pairwise before being added, which costs a few
+    extra buffers but keeps rounding errors down for long float sums.
+    Returns this histogram."""
+    started = instrument.clock() if instrument.enabled else None
+    if tree:
+      total, merged = _pairwise_sum(hists, self._check_merge)
+      if total is not None:
+        self._add_contents(total)
+    else:
+      merged = 0
+      for other in hists:
+        self._check_merge(other)
+        self._add_contents(other)
+        merged += 1
+    if started is not None:
+      instrument.record(self, "merge", merged, 0, started)
+    return self
+
+  def _check_merge(self, other):
+    if not self.compatible(other):
+      raise BinError("Cannot merge histograms with different binning")
+
+  def _add_contents(self, other):
+    "Add the contents, flows and sumw2 of another histogram into this one"
+    if self._sumw2 is None and other._sumw2 is not None:
+      self.sumw2 = True
+    bound = self._shared.bound
+    self._invalidate()
+    if _narrow(self.dtype):
+      added = [other.view(numpy.ndarray), other._underflow, other._overflow]
+      if other._sumw2 is not None and self._counts_sumw2():
+        added.append(other._sumw2)
+      self._shared.bound = _headroom(self, bound, self._held(), _largest(added))
+    self.view(numpy.ndarray)[...] += other.view(numpy.ndarray)
+    self._underflow += other._underflow
+    self._overflow += other._overflow
+    if self._sumw2 is not None:
+      if other._sumw2 is None:
+        self._sumw2 += numpy.abs(other.view(numpy.ndarray))
+      else:
+        self._sumw2 += other._sumw2
+
+  def _split_batch(self, values):
+    """Split a batch of values into a sliceable sequence for every axis,
+    without reading or copying the data"""
+    if self.ndim == 1:
+      coordinates = [values]
+    else:
+      if not len(values) == self.ndim:
+        raise ValueError("Need coordinates for each of {} axes".format(self.ndim))
+      coordinates = list(values)
+    # Single entries can still be streamed, and lists are sliced as arrays
+    return [x if isinstance(x, numpy.ndarray) and x.ndim else numpy.atleast_1d(x)
+            for x in coordinates]
 
-  def draw_hist(self, **kwargs):
+  def _coordinates(self, values):
+    "Split fill values into a flat coordinate array for every axis"
+    return _split_coordinates(values, self.ndim)
+
+  def _accumulate(self, indices, weights):
+    """Add weights into the contents, given the bin indices for every entry.
+
+    indices holds an array for each axis. Indices below zero count as
+    underflow on that axis, and indices past the last bin count as
+    overflow. Weights may be None (unit weights), a scalar or an array
+    matching the indices. Returns the number of entries inside the bins.
+
+    Raises OverflowError, before changing anything, if integer storage
+    narrower than 64 bits might not hold the result."""
+    return self._fill_index(BinIndex(self._axes, indices), weights)
+
+  def _fill_index(self, index, weights):
+    "Add weights into the contents at the bins of a BinIndex"
+    _check_weights(weights, self.dtype)
+    self._reserve(index.entries, weights)
+    weights = index._add_flows(weights, self._underflow, self._overflow)
+    # Matching the weights to the contents keeps numpy.add.at on its fast path
+    target = self.view(numpy.ndarray)
+    if weights is None:
+      weights = target.dtype.type(1)
+    elif not weights.dtype == target.dtype:
+      weights = weights.astype(target.dtype)
+    # Accumulate everything in a single pass over the flat buffer
+    flat = index.flat
+    if len(flat) > 1 and _file_backed(target):
+      # Visit the pages of the file in order. A stable sort keeps the order
+      # entries are added to each bin, so the sums are unchanged
+      order = numpy.argsort(flat, kind="stable")
+      flat = flat[order]
+      if weights.ndim > 0:
+        weights = weights[order]
+    _add_at(target, flat, weights)
+    if self._sumw2 is not None:
+      _add_at(self._sumw2, flat, weights*weights)
+    return len(flat)
+
+  def draw_hist(self, resolution=DRAW_RESOLUTION, **kwargs):
+    """Draw the outline of the histogram, passing any keyword arguments
+    to matplotlib.pyplot.plot.
+
+    Histograms with more bins than resolution are decimated, keeping the
+    highest and lowest bin of each block so that peaks are still drawn.
+    Pass resolution=None to draw every bin."""
     assert self.ndim == 1
     import matplotlib.pyplot as plt
-    x = numpy.zeros(len(self)*2)
-    x[0::2] = self.bins[:-1]
-    x[1::2] = self.bins[1:]
-    y = numpy.array(numpy.repeat(self,2))
-    # import pdb
-    # pdb.set_trace()
-
+    x, y = _outline(self, resolution)
     return plt.plot(x,y,**kwargs)
 
   def pcolor(self, *args, **kwargs):
     assert self.ndim == 2
     import matplotlib.pyplot as plt
-    plt.pcolor(self.bins[0], self.bins[1], self.T, *args, **kwargs)
+    return plt.pcolor(self.bins[0], self.bins[1], self.view(numpy.ndarray).T, *args, **kwargs)
 
   def pcolormesh(self, *args, **kwargs):
+    """Draw a 2D histogram as a mesh, which is much quicker than pcolor
+    for large numbers of bins"""
     assert self.ndim == 2
     import matplotlib.pyplot as plt
-    plt.pcolor(self.bins[0], self.bins[1], self.T, *args, **kwargs)
\ No newline at end of file
+    return plt.pcolormesh(self.bins[0], self.bins[1], self.view(numpy.ndarray).T, *args, **kwargs)
+
+class BinIndex(object):
+  """The bins of a set of entries against some axes, with those outside
+  the bins already sorted into the flows. Made by Hist.bin_index.
+
+  flat holds the flattened bin index of every entry inside the bins, and
+  inside holds the positions of those entries among all entries, or None
+  if every entry is inside.
+  underflow and overflow hold, for each axis, the positions of the
+  entries below and above its bins."""
+  def __init__(self, axes, indices):
+    self.axes = axes
+    self.shape = indices[0].shape
+    self.entries = indices[0].size
+    shape = tuple(len(x) for x in axes)
+    indices = [x.ravel() for x in indices]
+    self.underflow = []
+    self.overflow = []
+    inrange = None
+    for index, bincount in zip(indices, shape):
+      under = index < 0
+      over = index >= bincount
+      nunder = numpy.count_nonzero(under)
+      nover = numpy.count_nonzero(over)
+      self.underflow.append(numpy.flatnonzero(under) if nunder else _NO_ENTRIES)
+      self.overflow.append(numpy.flatnonzero(over) if nover else _NO_ENTRIES)
+      if nunder or nover:
+        outside = under | over
+        inrange = ~outside if inrange is None else inrange & ~outside
+    self.inside = None
+    if inrange is not None:
+      self.inside = numpy.flatnonzero(inrange)
+      indices = [x[self.inside] for x in indices]
+    self.flat = indices[0]
+    if len(indices) > 1:
+      self.flat = numpy.ravel_multi_index(indices, shape)
+
+  def __len__(self):
+    return self.entries
+
+  def _add_flows(self, weights, underflow, overflow):
+    """Add the weights of the entries outside the bins into the flows of
+    each axis, returning the weights of those inside"""
+    for dim, (under, over) in enumerate(zip(self.underflow, self.overflow)):
+      if len(under):
+        underflow[dim] += _sum_weights(under, len(under), weights)
+      if len(over):
+        overflow[dim] += _sum_weights(over, len(over), weights)
+    if self.inside is not None and weights is not None and weights.ndim > 0:
+      weights = weights[self.inside]
+    return weights
+
+  def matches(self, axes):
+    "Was the index made for axes binned identically to these"
+    if axes is self.axes:
+      return True
+    return len(axes) == len(self.axes) and all(len(x) == len(y) and x.fingerprint == y.fingerprint
+                                               for x, y in zip(axes, self.axes))
+
+class _CoordinateIndexer(object):
+  "Converts coordinate selections on a histogram into bin indices"
+  def __init__(self, hist):
+    self._hist = hist
+
+  def _convert(self, index):
+    if not isinstance(index, tuple):
+      index = (index,)
+    if len(index) > self._hist.ndim:
+      raise IndexError("Too many coordinates for {} axes".format(self._hist.ndim))
+    converted = []
+    for selection, axis in zip(index, self._hist.axes):
+      edges = axis.edges
+      if isinstance(selection, slice):
+        if selection.step is not None:
+          raise IndexError("Cannot step through bins by coordinate")
+        start, stop = selection.start, selection.stop
+        if start is not None:
+          start = max(int(numpy.searchsorted(edges, start, side="right")) - 1, 0)
+        if stop is not None:
+          stop = int(numpy.searchsorted(edges, stop, side="left"))
+        converted.append(slice(start, stop))
+      else:
+        position = int(numpy.searchsorted(edges, selection, side="right")) - 1
+        if position < 0 or position >= len(axis):
+          raise IndexError("{} is outside of the bins".format(selection))
+        converted.append(position)
+    return tuple(converted)
+
+  def __getitem__(self, index):
+    return self._hist[self._convert(index)]
+
+  def __setitem__(self, index, value):
+    self._hist[self._convert(index)] = value
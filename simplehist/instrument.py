@@ -0,0 +1,153 @@
+# coding: utf-8
+
+"""
+instrument.py
+
+Optional measurement of the hot paths: filling, conversion with ashist
+and merging. Instrumentation is off by default, and then costs a single
+flag check per call.
+
+Turn it on, and query the measurements for any histogram:
+  >>> instrument.enable()
+  >>> a = Hist([0, 1, 2])
+  >>> a.fill([0.5, 1.5, 7])
+  >>> instrument.stats(a)["fill"]
+  OperationStats(calls=1, entries=3, outside=1, elapsed=2.1e-05)
+
+Find the histograms that take the most time:
+  >>> for hist, stats in instrument.tracked()[:5]:
+  ...   print(hist.shape, stats["fill"].elapsed)
+
+Or forward every measurement somewhere else as it happens:
+  >>> instrument.add_hook(lambda event: metrics.timing(event.operation, event.elapsed))
+
+Measurements for a histogram are dropped when it is garbage collected,
+but running totals for every operation are kept until reset().
+"""
+
+import collections
+import threading
+import weakref
+from timeit import default_timer as clock
+
+# Checked inline by the instrumented code, so that it costs nothing when off
+enabled = False
+
+# A single measurement, passed to hooks
+Event = collections.namedtuple("Event",
+  ["operation", "hist", "entries", "outside", "elapsed", "source"])
+
+class OperationStats(object):
+  """Accumulated measurements of one operation.
+
+  entries counts the values filled (for ashist, the bins converted, and
+  for merge, the histograms merged), and outside how many of them fell
+  outside of the bins. batch_sizes counts calls by their number of
+  entries, in powers of two: batch_sizes[n] counts the calls with
+  between 2**(n-1) and 2**n - 1 entries."""
+  __slots__ = ["calls", "entries", "outside", "elapsed", "batch_sizes"]
+  def __init__(self):
+    self.calls = 0
+    self.entries = 0
+    self.outside = 0
+    self.elapsed = 0.
+    self.batch_sizes = []
+
+  def add(self, entries, outside, elapsed):
+    self.calls += 1
+    self.entries += entries
+    self.outside += outside
+    self.elapsed += elapsed
+    bucket = int(entries).bit_length()
+    if bucket >= len(self.batch_sizes):
+      self.batch_sizes.extend([0] * (bucket + 1 - len(self.batch_sizes)))
+    self.batch_sizes[bucket] += 1
+
+  def __repr__(self):
+    return "OperationStats(calls={}, entries={}, outside={}, elapsed={:.3g})".format(
+      self.calls, self.entries, self.outside, self.elapsed)
+
+_lock = threading.Lock()
+# id(hist) -> (weak reference, {operation: OperationStats})
+_stats = {}
+_totals = {}
+_hooks = []
+
+def enable():
+  "Start recording measurements"
+  global enabled
+  enabled = True
+
+def disable():
+  "Stop recording measurements, keeping those already recorded"
+  global enabled
+  enabled = False
+
+def reset():
+  "Forget every measurement recorded so far"
+  with _lock:
+    _stats.clear()
+    _totals.clear()
+
+def add_hook(hook):
+  """Call hook(event) with an Event for every measurement recorded.
+
+  Hooks are called synchronously, from the thread doing the work."""
+  _hooks.append(hook)
+
+def remove_hook(hook):
+  _hooks.remove(hook)
+
+def stats(hist):
+  """The measurements recorded for a histogram, as a dictionary of
+  operation name to OperationStats"""
+  entry = _stats.get(id(hist))
+  if entry is None or not entry[0]() is hist:
+    return {}
+  return dict(entry[1])
+
+def totals():
+  """The measurements recorded for every histogram together, as a
+  dictionary of operation name to OperationStats"""
+  return dict(_totals)
+
+def tracked():
+  """Every live histogram with measurements, as (hist, stats) pairs with
+  the most time consuming first"""
+  entries = []
+  for reference, operations in list(_stats.values()):
+    hist = reference()
+    if hist is not None:
+      entries.append((hist, dict(operations)))
+  entries.sort(key=lambda x: sum(y.elapsed for y in x[1].values()), reverse=True)
+  return entries
+
+def record(hist, operation, entries, outside, started, source=None):
+  """Record an operation on a histogram that began at time started (from
+  clock()). Called by the instrumented code only while enabled."""
+  elapsed = clock() - started
+  key = id(hist)
+  with _lock:
+    entry = _stats.get(key)
+    if entry is None or not entry[0]() is hist:
+      entry = _stats[key] = (weakref.ref(hist, _forget(key)), {})
+    operations = entry[1]
+    if not operation in operations:
+      operations[operation] = OperationStats()
+    operations[operation].add(entries, outside, elapsed)
+    if not operation in _totals:
+      _totals[operation] = OperationStats()
+    _totals[operation].add(entries, outside, elapsed)
+  if _hooks:
+    event = Event(operation, hist, entries, outside, elapsed, source)
+    for hook in list(_hooks):
+      hook(event)
+
+def _forget(key):
+  "A weak reference callback, dropping measurements for a dead histogram"
+  def callback(reference):
+    with _lock:
+      entry = _stats.get(key)
+      if entry is not None and entry[0] is reference:
+        del _stats[key]
+  return callback
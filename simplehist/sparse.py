@@ -0,0 +1,240 @@
+# coding: utf-8
+
+"""
+sparse.py
+
+Sparse histograms, for high-dimensional binning where only a small
+fraction of the bins are ever filled.
+
+A SparseHist is created and filled just like a Hist, but only stores
+the bins with entries, keyed by their flattened index:
+  >>> a = SparseHist(([0, 1, 2], [0, 10, 20]))
+  >>> a.fill(([0.5, 1.5, 1.5], [15, 15, 15]))
+  >>> a.nnz
+  2
+
+It can be converted to a dense Hist, or projected onto some of its axes:
+  >>> a.todense()
+  Hist(([0, 1, 2],[ 0, 10, 20]), data=[[ 0.,  1.],
+         [ 0.,  2.]])
+  >>> a.project(1)
+  Hist([ 0, 10, 20], data=[ 0.,  3.])
+"""
+
+import numpy
+from .binning import BinError
+from .hists import (Hist, BinIndex, _build_axes, _axes_bins, _split_coordinates,
+                    _as_weights)
+
+class SparseHist(object):
+  """A histogram storing only occupied bins, sorted by flattened index"""
+  def __init__(self, bins, dtype=float, sumw2=False):
+    self._axes = _build_axes(bins)
+    self._bins = _axes_bins(self._axes)
+    self.shape = tuple(len(x) for x in self._axes)
+    self.ndim = len(self.shape)
+    self.dtype = numpy.dtype(dtype)
+    self._keys = numpy.zeros(0, dtype=numpy.int64)
+    self._values = numpy.zeros(0, dtype=self.dtype)
+    self._sumw2 = numpy.zeros(0, dtype=self.dtype) if sumw2 else None
+    self._underflow = numpy.zeros(self.ndim, dtype=self.dtype)
+    self._overflow = numpy.zeros(self.ndim, dtype=self.dtype)
+
+  @property
+  def bins(self):
+    """The bin edges; an array for one dimension, otherwise a tuple of
+    arrays for each axis"""
+    return self._bins
+
+  @property
+  def axes(self):
+    """The BinningScheme for each axis of the histogram"""
+    return self._axes
+
+  @property
+  def underflow(self):
+    "Sum of weights below the bins, on each axis"
+    return self._underflow[0] if self.ndim == 1 else self._underflow
+
+  @property
+  def overflow(self):
+    "Sum of weights at or above the bins, on each axis"
+    return self._overflow[0] if self.ndim == 1 else self._overflow
+
+  @property
+  def nnz(self):
+    "The number of bins stored"
+    return len(self._keys)
+
+  @property
+  def sumw2(self):
+    "The sum of squared weights of the stored bins, or None if not tracked"
+    return self._sumw2
+
+  def __len__(self):
+    return self.shape[0]
+
+  def __repr__(self):
+    return "{}({}, nnz={})".format(type(self).__name__,
+      ", ".join(str(x) for x in self.shape), self.nnz)
+
+  def items(self):
+    """Returns the bin index on each axis, and the contents, of every
+    stored bin"""
+    return numpy.unravel_index(self._keys, self.shape), self._values
+
+  def fill(self, values, weights=None):
+    """Fill the histogram from values, exactly as with Hist.fill.
+
+    Each batch is reduced to its unique bins first, then merged into the
+    stored bins."""
+    coordinates = _split_coordinates(values, self.ndim)
+    weights = _as_weights(weights, coordinates[0].shape)
+    index = BinIndex(self._axes, [axis.index(x) for axis, x in zip(self._axes, coordinates)])
+    weights = index._add_flows(weights, self._underflow, self._overflow)
+    keys, inverse = numpy.unique(index.flat, return_inverse=True)
+    if weights is None:
+      weights = self.dtype.type(1)
+    else:
+      weights = weights.astype(self.dtype, casting="same_kind", copy=False)
+    sums = numpy.zeros(len(keys), dtype=self.dtype)
+    numpy.add.at(sums, inverse, weights)
+    squares = None
+    if self._sumw2 is not None:
+      squares = numpy.zeros(len(keys), dtype=self.dtype)
+      numpy.add.at(squares, inverse, weights*weights)
+    self._insert(keys, sums, squares)
+
+  def _insert(self, keys, values, squares):
+    """Add values (and squared weights) for a sorted set of unique keys
+    into the stored bins"""
+    positions = numpy.searchsorted(self._keys, keys)
+    found = positions < len(self._keys)
+    found[found] = self._keys[positions[found]] == keys[found]
+    # Existing bins can be added to directly, as each appears only once
+    self._values[positions[found]] += values[found]
+    if self._sumw2 is not None:
+      self._sumw2[positions[found]] += squares[found]
+    new = ~found
+    if numpy.any(new):
+      self._keys = numpy.insert(self._keys, positions[new], keys[new])
+      self._values = numpy.insert(self._values, positions[new], values[new])
+      if self._sumw2 is not None:
+        self._sumw2 = numpy.insert(self._sumw2, positions[new], squares[new])
+
+  def copy(self):
+    other = SparseHist(self._axes, dtype=self.dtype, sumw2=self._sumw2 is not None)
+    other._keys = self._keys.copy()
+    other._values = self._values.copy()
+    if self._sumw2 is not None:
+      other._sumw2 = self._sumw2.copy()
+    other._underflow[...] = self._underflow
+    other._overflow[...] = self._overflow
+    return other
+
+  def compatible(self, other):
+    """Does another histogram have exactly the same binning as this one"""
+    if other._axes is self._axes:
+      return True
+    return self.shape == other.shape and all(
+      x.fingerprint == y.fingerprint for x, y in zip(self._axes, other._axes))
+
+  def todense(self):
+    "Convert to a dense Hist"
+    dense = Hist(self._axes, dtype=self.dtype, sumw2=self._sumw2 is not None)
+    dense.reshape(-1)[self._keys] = self._values
+    if self._sumw2 is not None:
+      dense.sumw2.reshape(-1)[self._keys] = self._sumw2
+    dense._underflow[...] = self._underflow
+    dense._overflow[...] = self._overflow
+    return dense
+
+  def project(self, axes):
+    """Sum over all but the given axes, returning a dense Hist.
+
+    axes is the index of an axis to keep, or a sequence of them."""
+    if numpy.isscalar(axes):
+      axes = [axes]
+    axes = list(axes)
+    kept = [self._axes[x] for x in axes]
+    projected = Hist(kept, dtype=self.dtype, sumw2=self._sumw2 is not None)
+    indices = numpy.unravel_index(self._keys, self.shape)
+    flat = numpy.ravel_multi_index([indices[x] for x in axes], projected.shape)
+    numpy.add.at(projected.reshape(-1), flat, self._values)
+    if self._sumw2 is not None:
+      numpy.add.at(projected.sumw2.reshape(-1), flat, self._sumw2)
+    projected._underflow[...] = self._underflow[axes]
+    projected._overflow[...] = self._overflow[axes]
+    return projected
+
+  def merge(self, hists):
+    """Add an iterable of identically binned sparse histograms into this
+    one, in place. Returns this histogram."""
+    for other in hists:
+      if not self.compatible(other):
+        raise BinError("Cannot merge histograms with different binning")
+      squares = None
+      if self._sumw2 is not None:
+        squares = numpy.abs(other._values) if other._sumw2 is None else other._sumw2
+      self._insert(other._keys, other._values, squares)
+      self._underflow += other._underflow
+      self._overflow += other._overflow
+    return self
+
+  def _scale(self, factor):
+    self._values *= factor
+    if self._sumw2 is not None:
+      self._sumw2 *= factor*factor
+    self._underflow *= factor
+    self._overflow *= factor
+    return self
+
+  def __iadd__(self, other):
+    if not isinstance(other, SparseHist):
+      return NotImplemented
+    return self.merge([other])
+
+  def __isub__(self, other):
+    if not isinstance(other, SparseHist):
+      return NotImplemented
+    return self.merge([-other])
+
+  def __imul__(self, factor):
+    if not numpy.isscalar(factor):
+      return NotImplemented
+    return self._scale(factor)
+
+  def __itruediv__(self, factor):
+    if not numpy.isscalar(factor):
+      return NotImplemented
+    return self._scale(1./factor)
+
+  def __add__(self, other):
+    if not isinstance(other, SparseHist):
+      return NotImplemented
+    return self.copy().merge([other])
+
+  def __sub__(self, other):
+    if not isinstance(other, SparseHist):
+      return NotImplemented
+    return self.copy().merge([-other])
+
+  def __neg__(self):
+    negated = self.copy()
+    negated._values *= -1
+    negated._underflow *= -1
+    negated._overflow *= -1
+    return negated
+
+  def __mul__(self, factor):
+    if not numpy.isscalar(factor):
+      return NotImplemented
+    return self.copy()._scale(factor)
+  __rmul__ = __mul__
+
+  def __truediv__(self, factor):
+    if not numpy.isscalar(factor):
+      return NotImplemented
+    return self.copy()._scale(1./factor)
+  __div__ = __truediv__
+  __idiv__ = __itruediv__
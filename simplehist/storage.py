@@ -0,0 +1,226 @@
+# coding: utf-8
+
+"""
+storage.py
+
+A compact binary file format for named collections of histograms, which
+can be opened lazily - histograms are memory-mapped from the file only
+when accessed, without copying.
+
+Save a collection of histograms:
+  >>> save_hists("hists.shist", {"pt": pt_hist, "eta": eta_hist})
+
+And open it again later:
+  >>> hists = HistFile("hists.shist")
+  >>> hists.keys()
+  ['pt', 'eta']
+  >>> hists["pt"]
+  Hist([0, 10, 20, 50], data=[ 12.,  30.,  5.])
+
+Histograms too large for memory can live in a file instead, created
+without ever being built in memory and filled in place:
+  >>> with create_hists("big.shist", {"xyzt": bins}, dtype=numpy.uint32) as hists:
+  ...   hists["xyzt"].fill(values)
+  ...   hists.flush()
+
+Other processes can open the same file read-only at the same time, and
+see the contents as they are filled.
+
+The file starts with a fixed-size prefix holding a magic number, the
+format version and the location of a JSON index. Each array (edges,
+contents, sumw2 and flows) is stored raw and aligned, with its location,
+dtype and shape recorded in the index.
+"""
+
+import json
+import struct
+import numpy
+from .hists import Hist, _build_axes
+
+MAGIC = b"SIMPLEHIST"
+VERSION = 1
+# Magic, version, index offset and index length
+_PREFIX = struct.Struct("<10sHQQ")
+# Alignment of every array stored in the file
+_ALIGNMENT = 64
+
+class HistFileError(IOError):
+  pass
+
+def _write_array(handle, array):
+  "Write an array at the next aligned position, returning its index entry"
+  padding = -handle.tell() % _ALIGNMENT
+  handle.write(b"\0" * padding)
+  array = numpy.ascontiguousarray(array)
+  entry = {"offset": handle.tell(), "dtype": array.dtype.str, "shape": list(array.shape)}
+  array.view(numpy.ndarray).tofile(handle)
+  return entry
+
+def _reserve_array(handle, dtype, shape):
+  """Leave an aligned, zeroed space for an array without writing it, so
+  that the file system can allocate it lazily"""
+  padding = -handle.tell() % _ALIGNMENT
+  dtype = numpy.dtype(dtype)
+  entry = {"offset": handle.tell() + padding, "dtype": dtype.str, "shape": list(shape)}
+  handle.seek(padding + int(numpy.prod(shape)) * dtype.itemsize, 1)
+  return entry
+
+def _write_index(handle, index):
+  "Write the index, then go back and point the prefix at it"
+  encoded = json.dumps(index).encode("utf-8")
+  offset = handle.tell()
+  handle.write(encoded)
+  handle.seek(0)
+  handle.write(_PREFIX.pack(MAGIC, VERSION, offset, len(encoded)))
+
+def save_hists(filename, hists):
+  """Write a collection of histograms to a file.
+
+  hists is either a dictionary of histograms, or an iterable of
+  (name, hist) pairs."""
+  if hasattr(hists, "items"):
+    hists = hists.items()
+  index = []
+  with open(filename, "wb") as handle:
+    handle.write(b"\0" * _PREFIX.size)
+    for name, hist in hists:
+      edges = [hist.bins] if hist.ndim == 1 else list(hist.bins)
+      entry = {
+        "name": name,
+        "edges": [_write_array(handle, x) for x in edges],
+        "contents": _write_array(handle, hist),
+        "sumw2": None,
+        "underflow": _write_array(handle, hist._underflow),
+        "overflow": _write_array(handle, hist._overflow),
+      }
+      if hist.sumw2 is not None:
+        entry["sumw2"] = _write_array(handle, hist.sumw2)
+      index.append(entry)
+    _write_index(handle, index)
+
+def create_hists(filename, layout, dtype=float, sumw2=False):
+  """Create a file of empty histograms, and open it for writing.
+
+  layout is a dictionary, or an iterable of pairs, giving the bins for
+  each named histogram. Space for the contents is left for the file
+  system to fill with zeros as it is used, so nothing the size of the
+  histograms is ever built in memory. Returns the opened HistFile."""
+  if hasattr(layout, "items"):
+    layout = layout.items()
+  index = []
+  with open(filename, "wb") as handle:
+    handle.write(b"\0" * _PREFIX.size)
+    for name, bins in layout:
+      axes = _build_axes(bins)
+      shape = [len(x) for x in axes]
+      entry = {
+        "name": name,
+        "edges": [_write_array(handle, x.edges) for x in axes],
+        "underflow": _write_array(handle, numpy.zeros(len(axes), dtype=dtype)),
+        "overflow": _write_array(handle, numpy.zeros(len(axes), dtype=dtype)),
+        "sumw2": _reserve_array(handle, dtype, shape) if sumw2 else None,
+        "contents": _reserve_array(handle, dtype, shape),
+      }
+      index.append(entry)
+    _write_index(handle, index)
+  hists = HistFile(filename, mode="r+")
+  hists._empty.update(x["name"] for x in index)
+  return hists
+
+class HistFile(object):
+  """A mapping of names to histograms stored in a file.
+
+  Only the index is read on opening. Histograms are created on first
+  access as views onto a memory map of the file, so only the parts of the
+  file that are used are ever read, and the same Hist is returned for a
+  name every time after that. With mode="r+" changes to histograms are
+  written back to the file, and with mode="c" they are kept in memory
+  only.
+
+  Filling a histogram held in a file sorts each batch by bin first, so
+  that pages of the file are visited in order."""
+  def __init__(self, filename, mode="r"):
+    self.filename = filename
+    with open(filename, "rb") as handle:
+      prefix = handle.read(_PREFIX.size)
+      if len(prefix) < _PREFIX.size:
+        raise HistFileError("{} is not a histogram file".format(filename))
+      magic, version, offset, length = _PREFIX.unpack(prefix)
+      if not magic == MAGIC:
+        raise HistFileError("{} is not a histogram file".format(filename))
+      if not version == VERSION:
+        raise HistFileError("{} has unsupported version {}".format(filename, version))
+      handle.seek(offset)
+      index = json.loads(handle.read(length).decode("utf-8"))
+    self._index = dict((x["name"], x) for x in index)
+    self._names = [x["name"] for x in index]
+    self._map = numpy.memmap(filename, dtype=numpy.uint8, mode=mode)
+    self._hists = {}
+    # Histograms known to be empty, so that the first fill needn't read
+    # the contents to check that narrow storage has room
+    self._empty = set()
+
+  def _array(self, entry):
+    "View an array stored in the file, without reading it"
+    dtype = numpy.dtype(entry["dtype"])
+    shape = tuple(entry["shape"])
+    count = int(numpy.prod(shape)) * dtype.itemsize
+    start = entry["offset"]
+    return self._map[start:start+count].view(dtype).reshape(shape)
+
+  def __getitem__(self, name):
+    # Each histogram is built once, so that what it knows of its contents
+    # (such as the room left in narrow storage) is kept between accesses
+    hist = self._hists.get(name)
+    if hist is None:
+      if self._map is None:
+        raise HistFileError("{} is closed".format(self.filename))
+      hist = self._hists[name] = self._load(name)
+    return hist
+
+  def _load(self, name):
+    "Create a histogram viewing the arrays of an entry in the file"
+    entry = self._index[name]
+    edges = [self._array(x) for x in entry["edges"]]
+    hist = Hist(edges[0] if len(edges) == 1 else tuple(edges),
+                data=self._array(entry["contents"]))
+    if entry["sumw2"] is not None:
+      hist._sumw2 = self._array(entry["sumw2"])
+    hist._underflow = self._array(entry["underflow"])
+    hist._overflow = self._array(entry["overflow"])
+    if name in self._empty:
+      hist._shared.bound = 0
+    return hist
+
+  def __contains__(self, name):
+    return name in self._index
+
+  def __iter__(self):
+    return iter(self._names)
+
+  def __len__(self):
+    return len(self._names)
+
+  def keys(self):
+    return list(self._names)
+
+  def items(self):
+    return [(name, self[name]) for name in self._names]
+
+  def flush(self):
+    "Write any changes made to histograms back to the file"
+    if self._map is not None and self._map.mode == "r+":
+      self._map.flush()
+
+  def close(self):
+    """Write back any changes, and release the file. Histograms already
+    accessed stay valid until they are no longer referenced"""
+    self.flush()
+    self._map = None
+    self._hists = {}
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
@@ -0,0 +1,81 @@
+# coding: utf-8
+"""
+fakeroot.py
+
+Lightweight stand-ins for ROOT histograms, exposing the parts of the
+TH1/TH2/TH3 interface used by the converters, backed by numpy arrays.
+"""
+
+import numpy
+
+class TArrayD(object):
+  def __init__(self, values=()):
+    self._array = numpy.asarray(values, dtype=numpy.float64)
+  def GetSize(self):
+    return len(self._array)
+  def GetArray(self):
+    return self._array
+  def GetAt(self, index):
+    return self._array[index]
+
+class TAxis(object):
+  def __init__(self, edges, fixed=False):
+    self._edges = numpy.asarray(edges, dtype=numpy.float64)
+    # Fixed-width axes in ROOT don't store their edges
+    self._xbins = TArrayD(() if fixed else self._edges)
+  def GetNbins(self):
+    return len(self._edges)-1
+  def GetXbins(self):
+    return self._xbins
+  def GetXmin(self):
+    return self._edges[0]
+  def GetXmax(self):
+    return self._edges[-1]
+  def GetBinLowEdge(self, index):
+    return self._edges[index-1]
+
+class TH(object):
+  """A ROOT-style histogram. cells holds the contents including the flow
+  bins, indexed in (x, y, z) order. Create through the concrete classes,
+  e.g. TH1D, as ROOT types are distinct"""
+  def __init__(self, axes, cells, sumw2=None):
+    classname = type(self).__name__
+    self._classname = classname
+    self._axes = list(axes) + [TAxis([0, 1])] * (3-len(axes))
+    self._cells = numpy.asarray(cells, dtype=_dtypes[classname[-1]])
+    assert self._cells.shape == tuple(x.GetNbins()+2 for x in axes)
+    # ROOT stores the x axis varying fastest
+    self._buffer = numpy.ascontiguousarray(self._cells.T).ravel()
+    self._sumw2 = TArrayD(() if sumw2 is None else numpy.asarray(sumw2, dtype=float).T.ravel())
+
+  def ClassName(self):
+    return self._classname
+  def GetXaxis(self):
+    return self._axes[0]
+  def GetYaxis(self):
+    return self._axes[1]
+  def GetZaxis(self):
+    return self._axes[2]
+  def GetNbinsX(self):
+    return self._axes[0].GetNbins()
+  def GetNbinsY(self):
+    return self._axes[1].GetNbins()
+  def GetArray(self):
+    return self._buffer
+  def GetSumw2N(self):
+    return self._sumw2.GetSize()
+  def GetSumw2(self):
+    return self._sumw2
+  def GetBinLowEdge(self, index):
+    return self._axes[0].GetBinLowEdge(index)
+  def GetBinContent(self, *index):
+    return self._cells[index]
+
+_dtypes = {"C": numpy.int8, "S": numpy.int16, "I": numpy.int32,
+           "F": numpy.float32, "D": numpy.float64}
+
+# Each concrete histogram class, TH1C to TH3D
+for _dim in (1, 2, 3):
+  for _type in _dtypes:
+    _name = "TH{}{}".format(_dim, _type)
+    globals()[_name] = type(_name, (TH,), {})
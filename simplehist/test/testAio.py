@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+testAio.py
+
+Tests filling histograms from asynchronous sources.
+"""
+
+import asyncio
+import time
+import numpy
+from simplehist import Hist
+from simplehist.aio import HistStream
+
+async def _records(values, pause_every=100, pause=0):
+  for i, value in enumerate(values):
+    if i % pause_every == 0:
+      await asyncio.sleep(pause)
+    yield value
+
+def testStreamMatchesFill():
+  values = numpy.random.uniform(-1, 11, 10000)
+  stream = HistStream(Hist(range(11)), batch_size=1000)
+  count = asyncio.run(stream.consume(_records(values)))
+  direct = Hist(range(11))
+  direct.fill(values)
+  assert count == 10000
+  assert stream.records == 10000
+  assert stream.batches >= 10
+  assert numpy.all(stream.hist == direct)
+  assert stream.hist.overflow == direct.overflow
+
+def testWeightedND():
+  records = [((0.5, 1.5), 2.), ((1.5, 0.5), 1.), ((5, 0.5), 3.)]
+  stream = HistStream(Hist(([0, 1, 2], [0, 1, 2])), weighted=True)
+  asyncio.run(stream.consume(_records(records)))
+  assert stream.hist[0, 1] == 2
+  assert stream.hist[1, 0] == 1
+  assert list(stream.hist.overflow) == [3, 0]
+
+def testTimeWindow():
+  "A quiet source still has its records filled, by time"
+  stream = HistStream(Hist(range(11)), batch_size=1000, interval=0.01)
+  snapshots = []
+  async def source():
+    for value in range(5):
+      yield value
+    await asyncio.sleep(0.2)
+    snapshots.append(stream.snapshot())
+    yield 5
+  asyncio.run(stream.consume(source()))
+  assert snapshots[0].sum() == 5
+  assert stream.hist.sum() == 6
+  assert stream.batches == 2
+
+def testBackpressure():
+  "The source isn't read far ahead of slow fills"
+  class SlowHist(Hist):
+    def fill(self, values, weights=None):
+      time.sleep(0.01)
+      super(SlowHist, self).fill(values, weights)
+  stream = HistStream(SlowHist(range(11)), batch_size=10, interval=1, pending=1)
+  ahead = []
+  async def source():
+    for value in range(500):
+      ahead.append(value - stream.records)
+      yield value % 10
+  asyncio.run(stream.consume(source()))
+  assert stream.records == 500
+  # At most a queue, a batch being gathered and a batch filling
+  assert max(ahead) <= 3*10 + 1
+
+def testConsistentSnapshots():
+  stream = HistStream(Hist(range(11)), batch_size=100, interval=10)
+  snapshots = []
+  async def source():
+    for value in range(5000):
+      if value % 370 == 0:
+        snapshots.append(await stream.snapshot_async())
+      yield value % 10
+  asyncio.run(stream.consume(source()))
+  assert stream.hist.sum() == 5000
+  assert all(x.sum() % 100 == 0 for x in snapshots)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+testBinning.py
+
+Tests the binning schemes, and bin lookups against them.
+"""
+
+import numpy
+from nose.tools import assert_raises
+from simplehist.binning import BinningScheme, BinError
+
+def _digitize(values, edges):
+  return numpy.digitize(values, edges) - 1
+
+def testOrdering():
+  assert_raises(BinError, BinningScheme, [0, 2, 1])
+  assert_raises(ValueError, BinningScheme, [0, 2, 1])
+
+def testRegularDetection():
+  assert BinningScheme(range(101)).regular
+  assert BinningScheme(numpy.linspace(-3, 7.1, 2001)).regular
+  assert not BinningScheme([0, 1, 3, 4]).regular
+  assert not BinningScheme([0, 1, 3, 4]).logregular
+  log = BinningScheme(numpy.logspace(-2, 3, 51))
+  assert log.logregular
+  assert not log.regular
+
+def testRegularIndex():
+  "Tests that the arithmetic lookup matches a search exactly"
+  edges = numpy.linspace(-3, 7.1, 1001)
+  scheme = BinningScheme(edges)
+  values = numpy.concatenate([numpy.random.uniform(-4, 8, 10000), edges,
+                              numpy.nextafter(edges, -numpy.inf),
+                              [numpy.nan, numpy.inf, -numpy.inf]])
+  assert numpy.all(scheme.index(values) == _digitize(values, edges))
+
+def testLogIndex():
+  edges = numpy.logspace(-2, 3, 51)
+  scheme = BinningScheme(edges)
+  values = numpy.concatenate([numpy.random.uniform(-1, 1100, 10000), edges,
+                              numpy.nextafter(edges, 0), [0, numpy.nan]])
+  assert numpy.all(scheme.index(values) == _digitize(values, edges))
+
+def testVariableIndex():
+  edges = [0, 1, 3, 4]
+  scheme = BinningScheme(edges)
+  values = [-1, 0, 0.5, 1, 2.9, 3, 4, 5]
+  assert list(scheme.index(values)) == [-1, 0, 0, 1, 1, 2, 3, 3]
+
+def testDerivedArrays():
+  scheme = BinningScheme([0, 1, 3, 4])
+  assert len(scheme) == 3
+  assert list(scheme.centers) == [0.5, 2, 3.5]
+  assert list(scheme.widths) == [1, 2, 1]
+  assert list(scheme.lowedges) == [0, 1, 3]
+  # Cached, and can't be changed underneath us
+  assert scheme.centers is scheme.centers
+  assert not scheme.edges.flags.writeable
+  assert not scheme.centers.flags.writeable
+  source = numpy.array([0., 1, 2])
+  scheme = BinningScheme(source)
+  source[0] = -5
+  assert scheme[0] == 0
+
+def testSearchBins():
+  from simplehist.binning import search_bins
+  bins = [0, 1, 3, 4]
+  assert search_bins(2, bins) == 1
+  assert search_bins(-1, bins) == 0
+  assert search_bins(10, bins) == 2
+  assert list(search_bins([0.5, 1, 3.99, 5], bins)) == [0, 1, 2, 2]
+
+def testSharedAxes():
+  from simplehist import Hist
+  x, y = BinningScheme(range(4)), BinningScheme([0, 0.5, 1])
+  a = Hist((x, y))
+  assert a.shape == (3, 2)
+  assert a.axes[0] is x
+  assert Hist(x).axes[0] is x
+  assert list(Hist(x).bins) == [0, 1, 2, 3]
+
+def testSubset():
+  scheme = BinningScheme(numpy.linspace(0, 10, 101))
+  coarse = scheme.subset(scheme.rebin_indices(5))
+  assert len(coarse) == 20
+  assert coarse.regular
+  values = numpy.random.uniform(-1, 11, 1000)
+  assert numpy.all(coarse.index(values) == _digitize(values, coarse.edges))
+  logscale = BinningScheme(numpy.logspace(0, 2, 21)).subset([2, 4, 6, 8])
+  assert logscale.logregular
+  assert numpy.all(logscale.index(values) == _digitize(values, logscale.edges))
+  assert not scheme.subset([0, 1, 3]).regular
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+testBook.py
+
+Tests filling many booked histograms from batches of columns.
+"""
+
+import numpy
+from nose.tools import assert_raises
+from simplehist import Hist, HistBook
+
+def _batch(size=1000):
+  return {"pt": numpy.random.uniform(-10, 110, size),
+          "eta": numpy.random.uniform(-3, 3, size),
+          "w": numpy.random.uniform(size=size)}
+
+def testMatchesIndividualFills():
+  book = HistBook()
+  book.book("pt", Hist(numpy.linspace(0, 100, 51)), "pt")
+  book.book("ptw", Hist(numpy.linspace(0, 100, 51)), "pt", weight="w",
+            selection=lambda b: abs(b["eta"]) < 1)
+  book.book("pteta", Hist((numpy.linspace(0, 100, 51), [-2, 0, 2])), ("pt", "eta"),
+            weight="w")
+  assert book.keys() == ["pt", "ptw", "pteta"]
+
+  expected = [Hist(numpy.linspace(0, 100, 51)), Hist(numpy.linspace(0, 100, 51)),
+              Hist((numpy.linspace(0, 100, 51), [-2, 0, 2]))]
+  for _ in range(3):
+    batch = _batch()
+    book.fill(batch)
+    central = abs(batch["eta"]) < 1
+    expected[0].fill(batch["pt"])
+    expected[1].fill(batch["pt"][central], batch["w"][central])
+    expected[2].fill((batch["pt"], batch["eta"]), batch["w"])
+
+  for name, hist in zip(book, expected):
+    assert numpy.allclose(book[name], hist)
+    assert numpy.allclose(book[name].underflow, hist.underflow)
+    assert numpy.allclose(book[name].overflow, hist.overflow)
+
+def testSharedIndices():
+  "Identical binnings of the same column are only indexed once per batch"
+  book = HistBook()
+  first = Hist(numpy.linspace(0, 100, 11))
+  second = Hist(numpy.linspace(0, 100, 11))
+  calls = []
+  for hist in (first, second):
+    index = hist.axes[0].index
+    hist.axes[0].index = lambda values, index=index: calls.append(1) or index(values)
+  book.book("a", first, "pt")
+  book.book("b", second, "pt", weight="w")
+  book.fill(_batch())
+  assert len(calls) == 1
+
+def testStructuredArray():
+  batch = numpy.zeros(4, dtype=[("x", float), ("y", float)])
+  batch["x"] = [0.5, 1.5, 1.5, 5]
+  batch["y"] = [1, 1, 0, 1]
+  book = HistBook()
+  book.book("x", Hist([0, 1, 2]), "x", selection="y")
+  book.fill(batch)
+  assert list(book["x"]) == [1, 1]
+  assert book["x"].overflow == 1
+  assert_raises(ValueError, book.book, "bad", Hist([0, 1, 2]), ("x", "y"))
+
+def testPromotion():
+  book = HistBook()
+  book.book("x", Hist([0, 1, 2], dtype=numpy.uint32), "x")
+  book["x"][0] = numpy.iinfo(numpy.uint32).max
+  book.fill({"x": numpy.array([0.5, 1.5])})
+  assert book["x"].dtype == numpy.uint64
+  assert list(book["x"]) == [2**32, 1]
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+testConverter.py
+
+Tests conversion of ROOT histograms, using lightweight fake objects
+rather than depending on pyROOT.
+"""
+
+import numpy
+from simplehist import Hist, ashist, ashist_many
+from simplehist.test.fakeroot import TH1D, TH1F, TH1I, TH2I, TH3D, TAxis
+
+def testTH1():
+  cells = [3, 1, 2, 4, 5]
+  h = ashist(TH1D([TAxis([0, 1, 5, 10])], cells, sumw2=[9, 1, 4, 16, 25]))
+  assert isinstance(h, Hist)
+  assert list(h.bins) == [0, 1, 5, 10]
+  assert list(h) == [1, 2, 4]
+  assert h.underflow == 3
+  assert h.overflow == 5
+  assert list(h.sumw2) == [1, 4, 16]
+
+def testFixedAxis():
+  h = ashist(TH1F([TAxis(numpy.linspace(-5, 5, 11), fixed=True)], numpy.arange(12)))
+  assert h.dtype == numpy.float32
+  assert numpy.allclose(h.bins, numpy.linspace(-5, 5, 11))
+  assert list(h) == list(range(1, 11))
+  assert h.sumw2 is None
+
+def testTH2():
+  cells = numpy.arange(4*5).reshape(4, 5)
+  h = ashist(TH2I([TAxis([0, 1, 2]), TAxis([0, 1, 2, 3])], cells))
+  assert h.shape == (2, 3)
+  assert h.dtype == numpy.int32
+  assert numpy.all(h == cells[1:-1, 1:-1])
+  assert list(h.underflow) == [cells[0].sum(), cells[:, 0].sum()]
+  assert list(h.overflow) == [cells[-1].sum(), cells[:, -1].sum()]
+
+def testWeightedIntegerStorage():
+  h = ashist(TH1I([TAxis([0, 1, 2])], [0, 3, 2, 0], sumw2=[0, 2.25, 0.5, 0]))
+  assert h.dtype == numpy.int32
+  assert list(h.sumw2) == [2.25, 0.5]
+  assert list(h.promoted().sumw2) == [2.25, 0.5]
+
+def testTH3():
+  cells = numpy.random.uniform(size=(4, 5, 6))
+  sumw2 = numpy.random.uniform(size=(4, 5, 6))
+  axes = [TAxis(range(3)), TAxis(range(4), fixed=True), TAxis([0, 0.5, 1, 2, 4])]
+  source = TH3D(axes, cells, sumw2=sumw2)
+  h = ashist(source)
+  assert h.shape == (2, 3, 4)
+  assert numpy.all(h == cells[1:-1, 1:-1, 1:-1])
+  assert numpy.all(h.sumw2 == sumw2[1:-1, 1:-1, 1:-1])
+  assert numpy.isclose(h.underflow[2], cells[:, :, 0].sum())
+  # Contents are copied out of the ROOT buffers
+  assert not numpy.may_share_memory(h, source.GetArray())
+
+def testDirectConversion():
+  from simplehist.converter import fromTH1
+  h = fromTH1(TH1D([TAxis([0, 1])], [0, 2, 0]))
+  assert list(h) == [2]
+
+def testCopy():
+  a = Hist([0, 1, 2], data=[1, 2], sumw2=True)
+  b = ashist(a)
+  b.fill(0.5)
+  assert list(a) == [1, 2]
+  assert list(b.sumw2) == [2, 2]
+  assert ashist(a, copy=False) is a
+
+class Source(object):
+  def __init__(self, value):
+    self.value = value
+
+class DerivedSource(Source):
+  pass
+
+def testDispatchCache():
+  from simplehist import converter
+  calls = []
+  def predicate(x):
+    calls.append(x)
+    return isinstance(x, Source)
+  converter.converts_type(predicate)(lambda x: Hist([0, 1], data=[x.value]))
+  converted = ashist_many([Source(1), Source(2), Source(3)])
+  assert [x[0] for x in converted] == [1, 2, 3]
+  # The predicate is only checked once for the type
+  assert len(calls) == 1
+  # Registering invalidates the cache; names match through the whole MRO,
+  # and priority outranks both registration order and specificity
+  converter.converts_type(__name__ + ".Source", priority=1)(
+    lambda x: Hist([0, 1], data=[-x.value]))
+  converter.converts_type(__name__ + ".DerivedSource")(
+    lambda x: Hist([0, 1], data=[10*x.value]))
+  assert ashist(DerivedSource(2))[0] == -2
+  assert ashist(Source(2))[0] == -2
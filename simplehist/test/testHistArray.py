@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+testHistArray.py
+
+Tests arrays of identically binned histograms.
+"""
+
+import numpy
+from nose.tools import assert_raises
+from simplehist import Hist, HistArray
+
+def testFillMatchesSeparateHists():
+  ids = numpy.random.randint(0, 50, 10000)
+  values = numpy.random.uniform(-1, 11, 10000)
+  weights = numpy.random.uniform(0, 2, 10000)
+  array = HistArray(50, numpy.linspace(0, 10, 21), sumw2=True)
+  array.fill(ids, values, weights)
+  for channel in (0, 17, 49):
+    single = Hist(numpy.linspace(0, 10, 21), sumw2=True)
+    selected = ids == channel
+    single.fill(values[selected], weights[selected])
+    assert numpy.allclose(array[channel], single)
+    assert numpy.allclose(array[channel].sumw2, single.sumw2)
+    assert numpy.isclose(array.underflow[channel], single.underflow)
+    assert numpy.isclose(array.overflow[channel], single.overflow)
+  assert_raises(IndexError, array.fill, [50], [1])
+  assert_raises(ValueError, array.fill, [0, 1], [1])
+
+def testViews():
+  array = HistArray(3, [0, 1, 2])
+  hist = array[1]
+  assert isinstance(hist, Hist)
+  assert hist.axes is array.axes
+  hist.fill([0.5, 5])
+  assert list(array.contents[1]) == [1, 0]
+  assert array.overflow[1] == 1
+  tail = array[1:]
+  assert len(tail) == 2
+  tail.fill([0], [1.5])
+  assert list(array.contents[1]) == [1, 1]
+  assert len(list(array)) == 3
+
+def testViewIntegrals():
+  "Tests that histograms taken from the array see it change"
+  array = HistArray(2, [0, 1, 2])
+  view = array[1]
+  assert view.integral() == 0
+  array.fill([1, 1], [0.5, 1.5])
+  assert view.integral() == 2
+  array.scale(3)
+  assert view.integral() == 6
+
+def testWholeArrayOperations():
+  array = HistArray(4, ([0, 1, 2], [0, 1, 2, 3]))
+  array.fill([0, 1, 1, 3], ([0.5, 0.5, 1.5, 1.5], [0.5, 2.5, 2.5, 9]))
+  assert list(array.integrals()) == [1, 2, 0, 0]
+  total = array.sum()
+  assert total.sum() == 3
+  assert list(total.overflow) == [0, 1]
+  projected = array.project(1)
+  assert projected.shape == (4, 3)
+  assert list(projected.contents[1]) == [0, 0, 2]
+  assert list(projected.overflow) == [0, 0, 0, 1]
+  transposed = array.project([1, 0])
+  assert numpy.all(transposed.contents == array.contents.transpose(0, 2, 1))
+  scaled = array * [1, 2, 3, 4]
+  assert list(scaled.integrals()) == [1, 4, 0, 0]
+  assert scaled.overflow[3, 1] == 4
+  doubled = array + array
+  assert list(doubled.integrals()) == [2, 4, 0, 0]
+  array /= 2
+  assert list(array.integrals()) == [0.5, 1, 0, 0]
+
+def testPromotion():
+  array = HistArray(2, [0, 1, 2], dtype=numpy.uint32)
+  array.contents[1, 0] = numpy.iinfo(numpy.uint32).max
+  array.fill([0, 1], [0.5, 0.5])
+  assert array.dtype == numpy.uint64
+  assert array.contents[1, 0] == 2**32
+  assert array.contents[0, 0] == 1
+  # Fills through the histograms of the array are checked alongside its own
+  array = HistArray(2, [0, 1, 2], dtype=numpy.uint8)
+  array.fill([1], [0.5])
+  array[1].fill([0.5] * 250)
+  array.fill([1] * 10, [0.5] * 10)
+  assert array.dtype == numpy.uint64 and array.contents[1, 0] == 261
+  # As are merges
+  array = HistArray(1, [0, 1], dtype=numpy.uint8)
+  array.contents[0] = 200
+  array.merge([array.copy()])
+  assert array.dtype == numpy.uint64 and array.contents[0, 0] == 400
+
+def testFillWeights():
+  from simplehist.binning import BinError
+  bins = (numpy.linspace(0, 1, 11), [0, 0.5, 1])
+  values = numpy.random.uniform(-0.1, 1.1, (2, 1000))
+  weights = numpy.random.uniform(0, 2, (5, 1000))
+  array = HistArray(5, bins, sumw2=True)
+  index = array[0].bin_index(values)
+  array.fill_weights(index, weights)
+  for row in range(5):
+    single = Hist(bins, sumw2=True)
+    single.fill(values, weights[row])
+    assert numpy.allclose(array[row], single)
+    assert numpy.allclose(array[row].sumw2, single.sumw2)
+    assert numpy.allclose(array[row].underflow, single.underflow)
+    assert numpy.allclose(array[row].overflow, single.overflow)
+  # Without an index, the bins are found from the values
+  again = HistArray(5, bins, sumw2=True)
+  again.fill_weights(values, weights)
+  assert numpy.allclose(again.contents, array.contents)
+  assert_raises(ValueError, array.fill_weights, index, weights[:, :10])
+  assert_raises(BinError, HistArray(5, [0, 1]).fill_weights, index, weights)
+  # Integer counts are added exactly, and fractional weights refused
+  counts = HistArray(2, [0, 1, 2], dtype=int)
+  counts.fill_weights([0.5, 0.5, 1.5], [[2**60, 1, 1], [1, 2, 3]])
+  assert counts.contents[0, 0] == 2**60 + 1
+  assert_raises(TypeError, counts.fill_weights, [0.5], [[0.5], [1]])
+  assert_raises(TypeError, counts.fill, [0], [0.5], [2.7])
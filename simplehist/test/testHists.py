@@ -8,7 +8,7 @@ Copyright (c) 2014 Nicholas Devenish <n.e.devenish@sussex.ac.uk>
 
 import numpy
 from nose.tools import assert_raises
-from simplehist import Hist
+from simplehist import Hist, sum_hists
 
 def testHistIndex():
   a = Hist(bins=[0,1,2,3], data=[0,1,2])
@@ -20,6 +20,47 @@ def testHistIndex():
 def testSlice():
   a = Hist(bins=[0,1,2,3], data=[0,1,2])
   assert len(a[1:]) == 2
+  assert list(a[1:].bins) == [1, 2, 3]
+  assert list(a[:-1].bins) == [0, 1, 2]
+  assert a[1:].axes[0].regular
+  # Slices are views onto the same contents
+  a[1:][0] = 5
+  assert a[1] == 5
+  assert type(a[::2]) is numpy.ndarray
+  assert type(a[[0, 2]]) is numpy.ndarray
+  # Empty selections leave no bins to make a histogram from
+  assert type(a[2:2]) is numpy.ndarray and len(a[2:2]) == 0
+  # As do selections adding new axes
+  assert type(a[:, None]) is numpy.ndarray and a[:, None].shape == (3, 1)
+  assert type(a[None]) is numpy.ndarray
+
+def testSliceND():
+  a = Hist((range(5), [0, 1, 3]), sumw2=True)
+  a.fill(([0.5, 3.5], [2, 0.5]))
+  sub = a[1:, 1]
+  assert sub.ndim == 1
+  assert list(sub.bins) == [1, 2, 3, 4]
+  assert list(sub.sumw2) == [0, 0, 0]
+  sub = a[..., 1:]
+  assert sub.shape == (4, 1)
+  assert list(sub.bins[1]) == [1, 3]
+  sub.sumw2[0] = 3
+  assert a.sumw2[0, 1] == 3
+  assert type(a[0, :, None]) is numpy.ndarray
+
+def testLoc():
+  a = Hist(numpy.linspace(0, 10, 11), data=numpy.arange(10.))
+  assert list(a.loc[2.5:7.0]) == [2, 3, 4, 5, 6]
+  assert list(a.loc[2.5:7.5].bins) == [2, 3, 4, 5, 6, 7, 8]
+  assert list(a.loc[:1.5]) == [0, 1]
+  assert a.loc[-5:].shape == (10,)
+  assert a.loc[3.2] == 3
+  assert_raises(IndexError, a.loc.__getitem__, 10)
+  assert type(a.loc[10:20]) is numpy.ndarray
+  b = Hist(([0, 1, 3, 4], [0, 10, 20]))
+  b.loc[2, 15] = 4
+  assert b[1, 1] == 4
+  assert b.loc[0.5:, 12].shape == (3,)
 
 def testPreserveDtype():
   "Tests that numpy array type is preserved"
@@ -63,24 +104,40 @@ def testUfunc():
   a = Hist(range(10))
   b = numpy.sum(a)
   assert b == 0
-#   def testFlows1(self):
-#     "Tests filling the underflow"
-#     a = hists.Hist(range(101))
-#     a.fill(-1)
-#     self.assertEqual(a.underflow, 1.0)
-
-#   def testFlows2(self):
-#     "Test missing the overflow"
-#     a = hists.Hist(range(101))
-#     a.fill(99.9999999)
-#     self.assertEqual(a.overflow, 0.0)
-
-#   def testFlows3(self):
-#     "Test filling the overflow"
-#     a = hists.Hist(range(101))
-#     a.fill(100)
-#     self.assertEqual(a.overflow, 1.0)
-  
+
+def testFlows():
+  "Tests filling the underflow and overflow"
+  a = Hist(range(101))
+  a.fill(-1)
+  assert a.underflow == 1.0
+  # Missing the overflow
+  a.fill(99.9999999)
+  assert a.overflow == 0.0
+  # Filling the overflow
+  a.fill(100)
+  assert a.overflow == 1.0
+  # Weighted entries, with flows mixed in
+  a.fill([-5, 50.5, 200], [0.5, 2, 3])
+  assert a.underflow == 1.5
+  assert a.overflow == 4.0
+  assert a[50] == 2
+  assert a.sum() == 3
+
+def testRepeatedIndexFill():
+  "Tests that repeated bins in one fill all accumulate"
+  a = Hist(range(5), dtype=int)
+  a.fill([1.5, 1.5, 1.5, 3.2])
+  assert list(a) == [0, 3, 0, 1]
+  assert a.dtype.kind == "i"
+
+def testIntegerWeights():
+  "Tests that integer storage refuses weights it would truncate"
+  a = Hist([0, 1, 2], dtype=int)
+  a.fill([0.5, 1.5], [2, 3])
+  assert list(a) == [2, 3]
+  assert_raises(TypeError, a.fill, [0.5, 1.5, 7], [2.7, 0.4, 1.5])
+  assert list(a) == [2, 3] and a.overflow == 0
+
 def testNegativeAxis():
   "Tests creation and filling of negative bin sets"
   a = Hist(range(-10,11))
@@ -99,3 +156,330 @@ def testOutOfOrderBinning():
   a = Hist([0,1,2,3])
   # Setting after construction
   assert_raises(ValueError, lambda: setattr(a,"bins", [0,2,1,3]))
+
+def test2DFill():
+  "Tests filling a multidimensional histogram"
+  a = Hist(([0, 1, 2], [0, 10, 20, 30]))
+  assert a.shape == (2, 3)
+  a.fill(([0.5, 1.5, 1.5], [5, 25, 25]))
+  assert a[0, 0] == 1
+  assert a[1, 2] == 2
+  # As an (N, M) array, with weights
+  a.fill(numpy.array([[0.5], [15]]), [0.5])
+  assert a[0, 1] == 0.5
+  # Each axis has its own flows
+  a.fill(([-1, 0.5, 5], [5, 35, -5]), [1, 2, 3])
+  assert list(a.underflow) == [1, 3]
+  assert list(a.overflow) == [3, 2]
+  assert a.sum() == 3.5
+
+def testNDFillMatchesHistogramdd():
+  edges = (numpy.linspace(0, 1, 11), [0, 0.1, 0.5, 1], numpy.linspace(-1, 1, 5))
+  values = numpy.random.uniform(-0.1, 1.1, (3, 1000))
+  weights = numpy.random.uniform(size=1000)
+  a = Hist(edges)
+  a.fill(values, weights)
+  expected, _ = numpy.histogramdd(values.T, bins=edges, weights=weights)
+  # histogramdd includes the top edge, which a Hist treats as overflow
+  onedge = numpy.any([x == e[-1] for x, e in zip(values, edges)], axis=0)
+  assert not numpy.any(onedge)
+  assert numpy.allclose(a, expected)
+
+def testStreamingFill():
+  "Tests filling in chunks from arrays and generators"
+  values = numpy.random.uniform(-10, 110, 1000)
+  weights = numpy.random.uniform(size=1000)
+  expected = Hist(range(101))
+  expected.fill(values, weights)
+
+  a = Hist(range(101))
+  progress = []
+  assert a.fill_iter(values, weights, chunksize=64,
+                     callback=lambda n, total: progress.append((n, total))) == 1000
+  assert numpy.allclose(a, expected)
+  assert numpy.isclose(a.underflow, expected.underflow)
+  assert progress[0] == (64, 1000)
+  assert progress[-1] == (1000, 1000)
+
+  # From generators of batches
+  b = Hist(range(101))
+  batches = (values[i:i+300] for i in range(0, 1000, 300))
+  weightbatches = (weights[i:i+300] for i in range(0, 1000, 300))
+  assert b.fill_iter(batches, weightbatches, chunksize=128) == 1000
+  assert numpy.allclose(b, expected)
+
+  # A list is a sequence of batches too, which needn't be the same length
+  c = Hist(range(101))
+  batches = [values[:300], values[300:]]
+  assert c.fill_iter(batches, [weights[:300], weights[300:]], chunksize=128) == 1000
+  assert numpy.allclose(c, expected)
+  d = Hist(range(101))
+  assert d.fill_iter([list(values[:10]), values[10:20]], numpy.array(2.)) == 20
+  assert d.sum() + d.underflow + d.overflow == 40
+
+def testStreamingMemmap():
+  "Tests filling a 2D histogram from a memory-mapped file"
+  import tempfile, os
+  values = numpy.random.uniform(0, 1, (2, 500))
+  handle, filename = tempfile.mkstemp(suffix=".npy")
+  os.close(handle)
+  try:
+    numpy.save(filename, values)
+    mapped = numpy.load(filename, mmap_mode="r")
+    a = Hist((numpy.linspace(0, 1, 5), numpy.linspace(0, 1, 3)))
+    assert a.fill_iter(mapped, chunksize=100) == 500
+    del mapped
+  finally:
+    os.remove(filename)
+  assert a.sum() == 500
+
+def testParallelFill():
+  "Tests that parallel fills match the serial result"
+  values = numpy.random.uniform(-10, 110, 10000)
+  expected = Hist(range(101), dtype=int)
+  expected.fill(values)
+  a = Hist(range(101), dtype=int)
+  a.fill_parallel(values, workers=4)
+  assert numpy.all(a == expected)
+  assert a.underflow == expected.underflow
+  assert a.overflow == expected.overflow
+
+  weights = numpy.random.uniform(size=10000)
+  results = []
+  for executor in ("thread", "process", "thread"):
+    b = Hist((numpy.linspace(-10, 110, 11), [0, 0.5, 1]))
+    b.fill_parallel((values, weights), weights, workers=3, executor=executor)
+    results.append(b)
+  assert numpy.all(results[0] == results[1])
+  assert numpy.all(results[0] == results[2])
+  assert numpy.isclose(results[0].sum(), weights.sum())
+
+def testSumw2():
+  "Tests tracking the sum of squared weights"
+  a = Hist([0, 1, 2], sumw2=True)
+  a.fill([0.5, 0.5, 1.5, 5], [2, 1, 3, 4])
+  assert list(a.sumw2) == [5, 9]
+  assert numpy.allclose(a.errors, numpy.sqrt([5, 9]))
+  assert a.overflow == 4
+  # Unweighted fills add one per entry
+  a.fill(0.5)
+  assert list(a.sumw2) == [6, 9]
+  # Without tracking, errors assume unweighted counts
+  b = Hist([0, 1, 2], data=[4, 9])
+  assert b.sumw2 is None
+  assert list(b.errors) == [2, 3]
+
+def testSumw2Layout():
+  "Tests that sumw2 follows copies, but not rearrangements of the contents"
+  import copy
+  a = Hist(([0, 1, 2], [0, 1, 2]), sumw2=True)
+  a.fill(([1.5], [0.5]), 3)
+  assert a.copy().sumw2[1, 0] == 9
+  assert copy.deepcopy(a).sumw2[1, 0] == 9
+  assert a.T.sumw2 is None
+  assert a.swapaxes(0, 1).sumw2 is None
+
+def testSumw2Arithmetic():
+  a = Hist([0, 1, 2], data=[2, 4], sumw2=[1, 2])
+  a.underflow = 1
+  b = Hist([0, 1, 2], data=[1, 1], sumw2=[3, 3])
+  assert list((a + b).sumw2) == [4, 5]
+  assert list((a - b).sumw2) == [4, 5]
+  assert (a + b).underflow == 1
+  scaled = a * 3
+  assert list(scaled.sumw2) == [9, 18]
+  assert scaled.underflow == 3
+  assert list((a / 2).sumw2) == [0.25, 0.5]
+  # Untracked operands count as unweighted
+  c = Hist([0, 1, 2], data=[5, 6])
+  assert list((a + c).sumw2) == [6, 8]
+  # In-place
+  a += b
+  assert list(a) == [3, 5]
+  assert list(a.sumw2) == [4, 5]
+  # And slices share the buffer
+  assert list(a[1:].sumw2) == [5]
+  assert (c + c).sumw2 is None
+
+def testMerge():
+  "Tests merging many histograms at once"
+  from simplehist import sum_hists
+  from simplehist.binning import BinError
+  parts = []
+  for i in range(10):
+    part = Hist(numpy.linspace(0, 1, 11), sumw2=(i == 3))
+    part.fill(numpy.random.uniform(-0.1, 1.1, 100))
+    parts.append(part)
+  for tree in (False, True):
+    total = sum_hists(parts, tree=tree)
+    assert total.sum() + total.underflow + total.overflow == 1000
+    assert numpy.allclose(total, numpy.sum(parts, axis=0))
+    assert numpy.allclose(total.sumw2, total)
+    assert parts[0].sumw2 is None
+  # Binning must match
+  other = Hist(numpy.linspace(0, 2, 11))
+  assert_raises(BinError, parts[0].merge, [other])
+  assert parts[0].compatible(Hist(numpy.linspace(0, 1, 11)))
+
+def testRebin():
+  "Tests combining bins by a factor, or onto new edges"
+  a = Hist(range(9), data=numpy.arange(8), sumw2=numpy.ones(8))
+  b = a.rebin(4)
+  assert list(b.bins) == [0, 4, 8]
+  assert list(b) == [6, 22]
+  assert list(b.sumw2) == [4, 4]
+  c = a.rebin([1, 2, 6])
+  assert list(c) == [1, 14]
+  assert c.underflow == 0
+  assert c.overflow == 13
+  assert_raises(ValueError, a.rebin, 3)
+  assert_raises(ValueError, a.rebin, [0, 2.5, 8])
+  assert_raises(ValueError, a.rebin, [0, 4, 2])
+  # Compact storage survives, unless the sums no longer fit
+  counts = Hist(range(5), data=[1, 2, 3, numpy.iinfo(numpy.uint32).max], dtype=numpy.uint32)
+  rebinned = counts.rebin([0, 2, 3])
+  assert rebinned.dtype == numpy.uint32 and list(rebinned) == [3, 3]
+  assert rebinned.overflow == numpy.iinfo(numpy.uint32).max
+  assert_raises(OverflowError, counts.rebin, 2)
+  # Including the flows that bins are moved into
+  small = Hist(range(5), data=[200, 0, 0, 0], dtype=numpy.uint8)
+  small.underflow = 200
+  assert_raises(OverflowError, small.rebin, [1, 2, 3, 4])
+
+def testRebinND():
+  a = Hist((range(5), numpy.linspace(0, 1, 7)))
+  values = numpy.random.uniform(0, 1, (2, 1000))
+  values[0] *= 4
+  a.fill(values)
+  b = a.rebin((2, [0, 0.5, 1]))
+  expected = Hist(([0, 2, 4], [0, 0.5, 1]))
+  expected.fill(values)
+  assert numpy.all(b == expected)
+  assert a.rebin((None, 3)).shape == (4, 2)
+  assert a.rebin(2).shape == (2, 3)
+
+def testDrawOutline():
+  from simplehist.hists import _outline
+  a = Hist([0, 1, 2, 3], data=[1, 3, 2])
+  x, y = _outline(a, None)
+  assert list(x) == [0, 1, 1, 2, 2, 3]
+  assert list(y) == [1, 1, 3, 3, 2, 2]
+  # Decimation keeps single-bin spikes and dips
+  b = Hist(numpy.arange(100001), data=numpy.ones(100000))
+  b[12345] = 50
+  b[67890] = -50
+  x, y = _outline(b, 1000)
+  assert len(x) <= 2000
+  assert y.max() == 50 and y.min() == -50
+  assert x[numpy.argmax(y)] in (12345, 12346)
+  assert numpy.all(numpy.diff(x) >= 0)
+
+def testDrawMany():
+  import matplotlib
+  matplotlib.use("Agg")
+  import matplotlib.pyplot as plt
+  from simplehist import draw_hists
+  hists = [Hist(numpy.linspace(0, 1, 101), data=numpy.random.uniform(size=100)) for _ in range(20)]
+  collection = draw_hists(hists, colors="k")
+  assert len(collection.get_segments()) == 20
+  mesh = Hist(([0, 1, 2], [0, 1, 2, 3]), data=numpy.ones((2, 3))).pcolormesh()
+  assert mesh is not None
+  plt.close("all")
+
+def testIntegral():
+  a = Hist(numpy.arange(11.), data=numpy.arange(10.))
+  assert a.integral() == 45
+  assert a.integral(2.5, 4) == 4
+  assert a.integral(2, 5, index=True) == 9
+  assert a.integral(None, 1.5) == 0.5
+  assert list(a.integral([0, 2], [10, 4])) == [45, 5]
+  # Changes to the contents are always seen
+  a.fill(3.5)
+  assert a.integral(3, 4) == 4
+  a[3] = 0
+  assert a.integral(3, 4) == 0
+  a += 1
+  assert a.integral(3, 4) == 1
+  a[2:5][1] = 7
+  assert a.integral(3, 4) == 7
+  # As are changes made through the histogram a slice views
+  h = Hist(range(11), data=numpy.ones(10))
+  s = h[2:8]
+  assert s.integral() == 6
+  h[3] = 100
+  assert s.integral() == s.sum() == 105
+  h.fill(2.5)
+  assert s.integral() == 106
+  b = Hist(([0, 1, 2], [0, 1, 2, 3]), data=numpy.arange(6.).reshape(2, 3))
+  assert b.integral() == 15
+  assert b.integral((0.5, 1), (2, 2.5)) == 7.5
+  assert b.integral((1, 0), (2, 2), index=True) == 7
+
+def testCDFAndQuantile():
+  a = Hist([0, 1, 2, 4], data=[1, 0, 3])
+  assert numpy.allclose(a.cdf(), [0.25, 0.25, 1])
+  assert a.cdf().axes[0] is a.axes[0]
+  assert numpy.allclose(a.quantile([0, 0.25, 0.5, 1]), [0, 1, 2+2./3, 4])
+  assert_raises(ValueError, a.quantile, 2)
+  b = Hist(([0, 1, 2], [0, 1]), data=[[1], [3]])
+  assert numpy.allclose(b.cdf(), [[0.25], [1]])
+  assert_raises(ValueError, b.quantile, 0.5)
+
+def testNarrowStorage():
+  a = Hist([0, 1, 2], dtype=numpy.uint32)
+  a.fill([0.5, 0.5, 1.5])
+  assert a.dtype == numpy.uint32
+  assert list(a) == [2, 1]
+  a[0] = numpy.iinfo(numpy.uint32).max - 2
+  a.fill([0.5, 0.5])
+  # Would wrap around, so refuses without changing anything
+  assert_raises(OverflowError, a.fill, [0.5, 1.5, 5])
+  assert a[0] == numpy.iinfo(numpy.uint32).max and a.overflow == 0
+  wider = a.promoted()
+  assert wider.dtype == numpy.uint64
+  wider.fill([0.5, 1.5, 5])
+  assert wider[0] == 2**32 and wider.overflow == 1
+  # Views onto the same contents don't trust each other's bounds
+  c = Hist(range(3), dtype=numpy.uint8)
+  view = c[0:1]
+  view.fill([.5])
+  c.fill([.5] * 250)
+  assert_raises(OverflowError, view.fill, [.5] * 10)
+  assert c[0] == 251
+  # Negative weights can't go into unsigned storage
+  assert_raises((TypeError, ValueError), a.fill, [0.5], [-1])
+  assert_raises(ValueError, a.fill_parallel, [1.5], numpy.array([-1]), workers=1)
+  assert a[1] == 1
+  # And merges are checked too
+  shards = [Hist([0, 1], data=[x], dtype=numpy.uint32) for x in (2**32-1, 5)]
+  assert_raises(OverflowError, shards[0].copy().merge, shards[1:])
+  assert_raises(OverflowError, sum_hists, shards, tree=True)
+  # Float32 storage takes float64 weights natively
+  b = Hist([0, 1, 2], dtype=numpy.float32, sumw2=True)
+  b.fill([0.5, 1.5], weights=numpy.array([0.5, 2.]))
+  assert b.dtype == numpy.float32 and b.sumw2.dtype == numpy.float32
+  assert list(b) == [0.5, 2]
+  assert b.promoted().sumw2.dtype == numpy.float64
+
+def testBinIndex():
+  from simplehist.binning import BinError
+  values = numpy.random.uniform(-1, 11, 1000)
+  weights = numpy.random.uniform(0, 2, 1000)
+  a = Hist(range(11), sumw2=True)
+  index = a.bin_index(values)
+  assert len(index) == 1000
+  a.fill(index, weights)
+  a.fill(index)
+  direct = Hist(range(11), sumw2=True)
+  direct.fill(values, weights)
+  direct.fill(values)
+  assert numpy.allclose(a, direct)
+  assert numpy.allclose(a.sumw2, direct.sumw2)
+  assert numpy.isclose(a.underflow, direct.underflow)
+  assert numpy.isclose(a.overflow, direct.overflow)
+  # Usable with any identically binned histogram, but no other
+  b = Hist(numpy.arange(11.))
+  b.fill(index)
+  assert b.sum() + b.underflow + b.overflow == 1000
+  assert_raises(BinError, Hist(range(12)).fill, index)
+  assert_raises(ValueError, a.fill, index, weights[:10])
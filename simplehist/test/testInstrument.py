@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+testInstrument.py
+
+Tests the optional instrumentation of filling, conversion and merging.
+"""
+
+import gc
+import numpy
+from simplehist import Hist, HistBook, instrument
+
+def _record(function):
+  "Run a function with instrumentation enabled, from a clean state"
+  instrument.reset()
+  instrument.enable()
+  try:
+    function()
+  finally:
+    instrument.disable()
+
+def testDisabled():
+  instrument.reset()
+  a = Hist([0, 1, 2])
+  a.fill([0.5, 1.5])
+  assert instrument.stats(a) == {}
+  assert instrument.totals() == {}
+
+def testFill():
+  a = Hist([0, 1, 2])
+  def fill():
+    a.fill([0.5, 1.5, 7, -1])
+    a.fill(numpy.full(300, 0.5))
+  _record(fill)
+  stats = instrument.stats(a)["fill"]
+  assert stats.calls == 2
+  assert stats.entries == 304
+  assert stats.outside == 2
+  assert stats.elapsed > 0
+  assert stats.batch_sizes[3] == 1
+  assert stats.batch_sizes[9] == 1
+  assert instrument.totals()["fill"].entries == 304
+  assert instrument.tracked()[0][0] is a
+
+def testMergeAndBook():
+  a = Hist([0, 1, 2])
+  book = HistBook()
+  book.book("x", Hist([0, 1, 2]), "x")
+  def run():
+    a.merge([Hist([0, 1, 2]) for _ in range(3)])
+    a.merge([Hist([0, 1, 2]) for _ in range(5)], tree=True)
+    book.fill({"x": numpy.array([0.5, 5])})
+  _record(run)
+  assert instrument.stats(a)["merge"].entries == 8
+  assert instrument.stats(book["x"])["fill"].outside == 1
+
+def testHooks():
+  events = []
+  instrument.add_hook(events.append)
+  try:
+    _record(lambda: Hist([0, 1, 2]).fill([0.5, 3]))
+  finally:
+    instrument.remove_hook(events.append)
+  assert len(events) == 1
+  assert events[0].operation == "fill"
+  assert events[0].entries == 2
+  assert events[0].outside == 1
+
+def testForgetsDeadHists():
+  _record(lambda: Hist([0, 1, 2]).fill(0.5))
+  gc.collect()
+  assert instrument.tracked() == []
+  assert instrument.totals()["fill"].calls == 1
+
+def testConversion():
+  from simplehist import ashist
+  from simplehist.test import fakeroot
+  source = fakeroot.TH1D([fakeroot.TAxis([0, 1, 2])], [0, 1, 2, 0])
+  converted = []
+  _record(lambda: converted.append(ashist(source)))
+  stats = instrument.stats(converted[0])["ashist"]
+  assert stats.calls == 1
+  assert stats.entries == 2
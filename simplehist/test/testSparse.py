@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+testSparse.py
+
+Tests sparse histograms against their dense equivalents.
+"""
+
+import numpy
+from nose.tools import assert_raises
+from simplehist import Hist, SparseHist
+from simplehist.binning import BinError
+
+def _edges():
+  return (numpy.linspace(0, 1, 11), [0, 0.2, 0.5, 1], numpy.linspace(-1, 1, 5))
+
+def testFillMatchesDense():
+  values = numpy.random.uniform(-0.1, 1.1, (3, 1000))
+  weights = numpy.random.uniform(size=1000)
+  dense = Hist(_edges(), sumw2=True)
+  sparse = SparseHist(_edges(), sumw2=True)
+  # In several batches, so that bins are merged
+  for batch in numpy.array_split(numpy.arange(1000), 4):
+    dense.fill(values[:, batch], weights[batch])
+    sparse.fill(values[:, batch], weights[batch])
+  converted = sparse.todense()
+  assert sparse.nnz <= numpy.count_nonzero(dense)
+  assert numpy.allclose(converted, dense)
+  assert numpy.allclose(converted.sumw2, dense.sumw2)
+  assert numpy.allclose(sparse.underflow, dense.underflow)
+  assert numpy.allclose(sparse.overflow, dense.overflow)
+  # Keys are kept sorted and unique
+  assert numpy.all(numpy.diff(sparse._keys) > 0)
+
+def testLargeShape():
+  "A shape far too large to allocate densely"
+  axis = numpy.linspace(0, 1, 501)
+  sparse = SparseHist((axis, axis, axis, axis), dtype=int)
+  sparse.fill(numpy.random.uniform(size=(4, 10000)))
+  sparse.fill(([0.001]*3, [0.001]*3, [0.999]*3, [0.5]*3))
+  assert sparse.shape == (500, 500, 500, 500)
+  assert sparse.items()[1].sum() == 10003
+  projected = sparse.project([0, 2])
+  assert projected.shape == (500, 500)
+  assert projected[0, 499] >= 3
+  assert projected.sum() == 10003
+
+def testProject():
+  values = numpy.random.uniform(0, 1, (3, 500))
+  dense = Hist(_edges())
+  dense.fill(values)
+  sparse = SparseHist(_edges())
+  sparse.fill(values)
+  assert numpy.allclose(sparse.project(1), dense.sum(axis=(0, 2)))
+  assert numpy.allclose(sparse.project((2, 0)), dense.sum(axis=1).T)
+
+def testArithmetic():
+  a = SparseHist(range(5))
+  a.fill([0.5, 1.5, 1.5, -1])
+  b = SparseHist(range(5))
+  b.fill([1.5, 3.5])
+  assert list((a + b).todense()) == [1, 3, 0, 1]
+  assert list((a - b).todense()) == [1, 1, 0, -1]
+  assert list((2 * a).todense()) == [2, 4, 0, 0]
+  assert (a * 2).underflow == 2
+  a += b
+  assert list(a.todense()) == [1, 3, 0, 1]
+  assert_raises(BinError, a.merge, [SparseHist(range(1, 6))])
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+# encoding: utf-8
+"""
+testStorage.py
+
+Tests writing histogram collections to file, and reading them back.
+"""
+
+import os
+import tempfile
+import numpy
+from nose.tools import assert_raises
+from simplehist import Hist, save_hists, HistFile
+from simplehist.storage import HistFileError
+
+def _tempfile():
+  handle, filename = tempfile.mkstemp(suffix=".shist")
+  os.close(handle)
+  return filename
+
+def testRoundTrip():
+  one = Hist([0, 1, 5, 10], sumw2=True)
+  one.fill([-1, 0.5, 3, 3, 20], [1, 2, 3, 4, 5])
+  two = Hist((range(4), numpy.linspace(0, 1, 5)), dtype=int)
+  two.fill(([0.5, 2.5], [0.1, 0.9]))
+  filename = _tempfile()
+  try:
+    save_hists(filename, [("one", one), ("two", two)])
+    with HistFile(filename) as hists:
+      assert hists.keys() == ["one", "two"]
+      assert "two" in hists
+      assert len(hists) == 2
+      loaded = hists["one"]
+      assert numpy.all(loaded == one)
+      assert numpy.all(loaded.bins == one.bins)
+      assert numpy.all(loaded.sumw2 == one.sumw2)
+      assert loaded.underflow == 1
+      assert loaded.overflow == 5
+      # Loaded lazily, as a read-only view of the file
+      assert not loaded.flags.owndata
+      assert not loaded.flags.writeable
+      loaded = hists["two"]
+      assert loaded.dtype == two.dtype
+      assert loaded.sumw2 is None
+      assert numpy.all(loaded == two)
+      assert all(numpy.all(x == y) for x, y in zip(loaded.bins, two.bins))
+      del loaded
+  finally:
+    os.remove(filename)
+
+def testUpdateInPlace():
+  filename = _tempfile()
+  try:
+    save_hists(filename, {"a": Hist(range(5))})
+    hists = HistFile(filename, mode="r+")
+    hists["a"].fill(2.5)
+    hists.close()
+    assert_raises(HistFileError, hists.__getitem__, "a")
+    assert list(HistFile(filename)["a"]) == [0, 0, 1, 0]
+  finally:
+    os.remove(filename)
+
+def testBadFile():
+  filename = _tempfile()
+  try:
+    with open(filename, "wb") as handle:
+      handle.write(b"Not a histogram file at all")
+    assert_raises(HistFileError, HistFile, filename)
+  finally:
+    os.remove(filename)
+
+def testCreateFileBacked():
+  from simplehist.storage import create_hists
+  filename = _tempfile()
+  try:
+    bins = (numpy.linspace(0, 1, 101), numpy.linspace(0, 1, 101), [0, 1, 2])
+    values = numpy.random.uniform(-0.1, 1.1, (3, 10000))
+    weights = numpy.random.uniform(0, 2, 10000)
+    with create_hists(filename, {"big": bins, "small": [0, 1, 2]}, sumw2=True) as hists:
+      # Nothing is built until it is used
+      assert not hists._hists
+      big = hists["big"]
+      assert not big.flags.owndata
+      assert big.sum() == 0
+      big.fill(values, weights)
+      # Every access gives the same histogram
+      assert hists["big"] is big
+      # Other readers see the contents, and the flows, as they are filled
+      reader = HistFile(filename)["big"]
+      assert not reader.flags.writeable
+      assert numpy.all(reader == big)
+      assert numpy.all(reader.overflow == big.overflow)
+      hists["small"].fill([0.5, 5])
+      big[:, :, 1] *= 2
+    expected = Hist(bins, sumw2=True)
+    expected.fill(values, weights)
+    expected[:, :, 1] *= 2
+    with HistFile(filename) as hists:
+      assert numpy.allclose(hists["big"], expected)
+      assert numpy.allclose(hists["big"].sumw2, expected.sumw2)
+      assert numpy.allclose(hists["big"].underflow, expected.underflow)
+      assert list(hists["small"]) == [1, 0]
+      assert hists["small"].overflow == 1
+  finally:
+    os.remove(filename)